@@ -0,0 +1,335 @@
+"""
+Benchmark of the API hot paths through an in-process ASGI client.
+
+For each size, synthetic seed files are generated, and kept in a cache directory for the
+next runs. A fresh Python process then starts the API on them. It records the startup time
+and the RSS once started. It then records the latency percentiles and throughput of each
+scenario, and the peak RSS. Results are written as JSON, and a run can be compared with a
+previous one, failing on regressions. Run from the app directory:
+
+    python -m benchmarks.api --sizes 1000,100000 --output baseline.json
+    python -m benchmarks.api --sizes 1000,100000 --output current.json --compare baseline.json
+
+The response cache is disabled unless --response-cache is given, so that rendering is
+measured rather than cache hits. Other settings (CONREG_BACKEND, CONREG_FAST_JSON...) are
+taken from the environment.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+from benchmarks.generate import write_seed
+
+APP_DIR = Path(__file__).parent.parent
+DEFAULT_SIZES = "1000,100000,1000000"
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "conreg-benchmarks"
+PAGE_SIZE = 100
+# Connectors whose sources are looked up beforehand, as targets of the update scenario
+UPDATE_TARGETS = 1000
+PERCENTILES = (50, 90, 99)
+# Metrics compared between runs, and whether a higher value is a regression
+COMPARED_METRICS = {
+    "startup_s": True,
+    "rss_mb": True,
+    "p50_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+}
+
+
+##
+##? Benchmarked process
+##
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+async def measure(
+    client, requests: list[tuple[str, str]], concurrency: int
+) -> dict[str, float | int]:
+    """
+    Send the (method, url) requests with `concurrency` clients, and summarize their latencies.
+    """
+    latencies = []
+    errors = 0
+    pending = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, url in pending:
+            start = perf_counter()
+            response = await client.request(method, url)
+            latencies.append(perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - start
+
+    latencies.sort()
+    result = {"requests": len(latencies), "errors": errors}
+    for q in PERCENTILES:
+        result[f"p{q}_ms"] = percentile(latencies, q) * 1000
+    result["max_ms"] = latencies[-1] * 1000
+    result["mean_ms"] = sum(latencies) / len(latencies) * 1000
+    result["throughput_rps"] = len(latencies) / elapsed
+    return result
+
+
+async def run_benchmark(requests: int, all_requests: int, concurrency: int, seed: int) -> dict:
+    """
+    Start the API configured by the environment, and run every scenario against it.
+    """
+    import httpx
+
+    # The app is imported here, so that the startup time includes its imports, and only by
+    # the benchmarked process
+    start = perf_counter()
+    from fake_data.db import REPOSITORY
+    from routers.connectors_and_sources import encode_cursor
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        result = {"startup_s": perf_counter() - start, "rss_mb": current_rss_mb()}
+
+        rng = random.Random(seed)
+        connector_uuids = [connector.uuid for connector in await REPOSITORY.list_connectors()]
+        pages = max(1, -(-len(connector_uuids) // PAGE_SIZE))
+        sources = []
+        for connector_uuid in rng.sample(
+            connector_uuids, min(UPDATE_TARGETS, len(connector_uuids))
+        ):
+            sources.extend(await REPOSITORY.list_sources(connector_uuid))
+
+        scenarios: dict[str, tuple[int, Callable[[], tuple[str, str]]]] = {
+            "retrieve_connectors_page": (
+                requests,
+                lambda: ("GET", f"/connectors?page={rng.randint(1, pages)}&limit={PAGE_SIZE}"),
+            ),
+            "retrieve_connectors_cursor": (
+                requests,
+                lambda: (
+                    "GET",
+                    f"/connectors?cursor={encode_cursor(rng.choice(connector_uuids))}"
+                    f"&limit={PAGE_SIZE}",
+                ),
+            ),
+            "retrieve_connectors_all": (all_requests, lambda: ("GET", "/connectors?all=true")),
+            "retrieve_connector": (
+                requests,
+                lambda: ("GET", f"/connectors/{rng.choice(connector_uuids)}"),
+            ),
+            "update_source": (
+                requests,
+                lambda: (
+                    "PATCH",
+                    "/connectors/{0.connector_uuid}/sources/{0.type.value}?available={1}".format(
+                        rng.choice(sources), str(rng.random() < 0.5).lower()
+                    ),
+                ),
+            ),
+        }
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            result["scenarios"] = {}
+            for name, (count, make_request) in scenarios.items():
+                requests_list = [make_request() for _ in range(count)]
+                result["scenarios"][name] = await measure(client, requests_list, concurrency)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+##
+##? Runs
+##
+
+
+def run_size(size: int, args: argparse.Namespace) -> dict:
+    """
+    Generate the seed files of a size if needed, and benchmark them in a fresh process.
+    """
+    seed_dir = args.cache_dir / f"{size}-{args.seed}"
+    if not (seed_dir / "sources.json").exists():
+        print(f"Generating {size} connectors into {seed_dir}", file=sys.stderr)
+        write_seed(seed_dir, size, args.seed)
+
+    env = {**os.environ, "CONREG_SEED_DIR": str(seed_dir)}
+    if not args.response_cache:
+        env["CONREG_RESPONSE_CACHE_SIZE"] = "0"
+    # A database file would outlive the run and be served to the next sizes
+    env.setdefault("CONREG_SQLITE_PATH", ":memory:")
+    with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.api",
+                "--requests",
+                str(args.requests),
+                "--all-requests",
+                str(args.all_requests),
+                "--concurrency",
+                str(args.concurrency),
+                "--seed",
+                str(args.seed),
+                "--result",
+                result_file.name,
+            ],
+            cwd=APP_DIR,
+            env=env,
+            check=True,
+            # The API prints its loading banners
+            stdout=subprocess.DEVNULL,
+        )
+        return {"connectors": size, **json.loads(Path(result_file.name).read_text())}
+
+
+def run_metadata(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests": args.requests,
+        "all_requests": args.all_requests,
+        "concurrency": args.concurrency,
+        "response_cache": args.response_cache,
+        "settings": {key: value for key, value in os.environ.items() if key.startswith("CONREG_")},
+    }
+
+
+def flatten(results: list[dict]) -> dict[tuple[int, str, str], float]:
+    """
+    Index the compared metrics of a run by (size, scenario, metric).
+    """
+    metrics = {}
+    for result in results:
+        for metric in COMPARED_METRICS:
+            if metric in result:
+                metrics[result["connectors"], "", metric] = result[metric]
+        for scenario, scenario_result in result["scenarios"].items():
+            for metric in COMPARED_METRICS:
+                if metric in scenario_result:
+                    metrics[result["connectors"], scenario, metric] = scenario_result[metric]
+    return metrics
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> bool:
+    """
+    Print the changes from a baseline run, and return whether one is a regression.
+    """
+    current = flatten(results)
+    regressed = False
+    for key, previous in flatten(baseline).items():
+        if key not in current or not previous:
+            continue
+        size, scenario, metric = key
+        change = current[key] / previous - 1
+        is_regression = (change if COMPARED_METRICS[metric] else -change) > tolerance
+        regressed |= is_regression
+        print(
+            f"{size:>9} {scenario or 'startup':<28} {metric:<15}"
+            f" {previous:12.2f} -> {current[key]:12.2f} {change:+8.1%}"
+            f"{'  REGRESSION' if is_regression else ''}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", default=DEFAULT_SIZES, help="Comma-separated numbers of connectors"
+    )
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument(
+        "--all-requests", type=int, default=5, help="Requests of the all=true scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent clients")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of data and requests")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--output", type=Path, help="File to write the results to")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Relative change deemed a regression"
+    )
+    # Set in the benchmarked processes
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.result is not None:
+        result = asyncio.run(
+            run_benchmark(args.requests, args.all_requests, args.concurrency, args.seed)
+        )
+        args.result.write_text(json.dumps(result))
+        return
+
+    results = []
+    for size in map(int, args.sizes.split(",")):
+        results.append(run_size(size, args))
+        result = results[-1]
+        print(
+            f"{size} connectors: started in {result['startup_s']:.2f} s,"
+            f" {result['rss_mb']:.0f} MB RSS ({result['peak_rss_mb']:.0f} MB peak)"
+        )
+        for name, scenario in result["scenarios"].items():
+            print(
+                f"  {name:<28} p50 {scenario['p50_ms']:9.2f} ms  p99 {scenario['p99_ms']:9.2f} ms"
+                f"  {scenario['throughput_rps']:9.1f} req/s  {scenario['errors']} errors"
+            )
+
+    output = json.dumps({"meta": run_metadata(args), "results": results}, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Synthetic seed files: connectors.json and sources.json scaled to any number of connectors.
+
+Connectors get one to three sources of distinct types, with the extra fields of the real
+seed files, so that loading them costs what loading real data would. The output only
+depends on the size and the random seed. Run from the app directory:
+
+    python -m benchmarks.generate 100000 /tmp/conreg-100k
+
+and start the API on them with CONREG_SEED_DIR=/tmp/conreg-100k.
+"""
+
+import argparse
+import json
+import random
+from collections.abc import Iterator
+from pathlib import Path
+from uuid import UUID
+
+from models.connectors_and_sources import TypeEnum
+
+SOURCE_TYPES = tuple(TypeEnum)
+STABILITY_STATUSES = ("stable", "unstable", "down", "unknown")
+
+
+def generate(size: int, seed: int = 0) -> Iterator[tuple[UUID, list[tuple[UUID, TypeEnum, bool]]]]:
+    """
+    Yield `size` connector UUIDs, each with its sources as (UUID, type, available) tuples.
+    """
+    rng = random.Random(seed)
+    for _ in range(size):
+        types = rng.sample(SOURCE_TYPES, rng.randint(1, len(SOURCE_TYPES)))
+        sources = [(UUID(int=rng.getrandbits(128)), type, rng.random() < 0.7) for type in types]
+        yield UUID(int=rng.getrandbits(128)), sources
+
+
+def write_seed(directory: Path, size: int, seed: int = 0) -> tuple[Path, Path]:
+    """
+    Write the connectors.json and sources.json seed files of `size` connectors.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    connectors_path = directory / "connectors.json"
+    sources_path = directory / "sources.json"
+    rng = random.Random(seed)
+    with connectors_path.open("w") as connectors_file, sources_path.open("w") as sources_file:
+        connectors_file.write("[")
+        sources_file.write("[")
+        first_source = True
+        for i, (connector_uuid, sources) in enumerate(generate(size, seed)):
+            connector = {
+                "uuid": str(connector_uuid),
+                "hidden": False,
+                "months_to_fetch": rng.randint(1, 24),
+                "stability": {
+                    "status": rng.choice(STABILITY_STATUSES),
+                    "last_update": "2025-03-10 14:00:25",
+                },
+            }
+            connectors_file.write(("," if i else "") + "\n" + json.dumps(connector))
+            for uuid, type, available in sources:
+                source = {
+                    "connector_uuid": str(connector_uuid),
+                    "uuid": str(uuid),
+                    "type": type.value,
+                    "available": available,
+                }
+                sources_file.write(("" if first_source else ",") + "\n" + json.dumps(source))
+                first_source = False
+        connectors_file.write("\n]\n")
+        sources_file.write("\n]\n")
+    return connectors_path, sources_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("size", type=int, help="Number of connectors")
+    parser.add_argument("directory", type=Path, help="Directory to write the seed files to")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    for path in write_seed(args.directory, args.size, args.seed):
+        print(f"Written {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Replay recorded requests against the API, in-process or over a local socket.
+
+The recording is a JSON Lines file, one request per line:
+
+    {"method": "GET", "path": "/connectors", "query": "limit=100", "timestamp": 1760000000.0}
+    {"method": "PATCH", "path": "/connectors", "body": {"connectors": []}, "timestamp": ...}
+
+`query` is a query string or an object, `body` any JSON document, and `timestamp` the time
+the request was received, in epoch seconds or ISO 8601. Requests are sent at the pace of
+their timestamps, scaled by --speed (2 replays twice as fast, 0 as fast as possible), by at
+most --concurrency clients. Latency histograms and error rates are reported per endpoint,
+UUIDs in paths being replaced with a placeholder. Run from the app directory:
+
+    python -m benchmarks.replay recording.jsonl --speed 2 --concurrency 16
+    python -m benchmarks.replay recording.jsonl --url http://127.0.0.1:8000 --output report.json
+
+In-process, the API is configured by the environment (CONREG_SEED_DIR...) as usual.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+from benchmarks.api import PERCENTILES, percentile
+
+UUID_PATTERN = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+# Upper bounds of the latency histogram buckets in milliseconds, the last one is unbounded
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class RecordedRequest(NamedTuple):
+    # Seconds since the first recorded request
+    offset: float
+    method: str
+    path: str
+    query: str | dict | None
+    body: object
+
+
+class Outcome(NamedTuple):
+    endpoint: str
+    latency: float
+    # None when the request failed before getting a response
+    status_code: int | None
+
+
+def parse_timestamp(value: float | int | str) -> float:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+def read_recording(path: Path) -> tuple[list[RecordedRequest], int]:
+    """
+    Read the requests of a recording, sorted by time.
+
+    Returns the requests and the number of lines skipped because they are not requests.
+    """
+    lines = []
+    skipped = 0
+    with path.open() as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict) or "method" not in record or "path" not in record:
+                skipped += 1
+                continue
+            lines.append(record)
+
+    timestamps = [parse_timestamp(record.get("timestamp", 0)) for record in lines]
+    start = min(timestamps, default=0)
+    requests = [
+        RecordedRequest(
+            timestamp - start,
+            record["method"].upper(),
+            record["path"],
+            record.get("query"),
+            record.get("body"),
+        )
+        for timestamp, record in zip(timestamps, lines)
+    ]
+    requests.sort(key=lambda request: request.offset)
+    return requests, skipped
+
+
+def endpoint_of(request: RecordedRequest) -> str:
+    return f"{request.method} {UUID_PATTERN.sub('{uuid}', request.path)}"
+
+
+async def replay(
+    client, requests: list[RecordedRequest], speed: float, concurrency: int
+) -> tuple[list[Outcome], float, float]:
+    """
+    Send the requests at their scaled pace, with at most `concurrency` of them in flight.
+
+    Returns the outcomes, the total duration, and the worst delay of a request behind its
+    schedule, which tells whether the replay kept up with the recorded traffic.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    outcomes = []
+    max_lag = 0.0
+
+    async def send(request: RecordedRequest):
+        kwargs = {"params": request.query}
+        if isinstance(request.body, str):
+            kwargs["content"] = request.body
+        elif request.body is not None:
+            kwargs["json"] = request.body
+        sent = perf_counter()
+        try:
+            response = await client.request(request.method, request.path, **kwargs)
+            status_code = response.status_code
+        except Exception as error:
+            print(f"{request.method} {request.path}: {error!r}", file=sys.stderr)
+            status_code = None
+        finally:
+            slots.release()
+        outcomes.append(Outcome(endpoint_of(request), perf_counter() - sent, status_code))
+
+    tasks = []
+    start = perf_counter()
+    for request in requests:
+        if speed > 0:
+            delay = start + request.offset / speed - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await slots.acquire()
+        if speed > 0:
+            max_lag = max(max_lag, perf_counter() - start - request.offset / speed)
+        tasks.append(asyncio.create_task(send(request)))
+    await asyncio.gather(*tasks)
+    return outcomes, perf_counter() - start, max_lag
+
+
+def summarize(outcomes: list[Outcome]) -> dict[str, dict]:
+    """
+    Latency percentiles, histogram and error rate of each endpoint.
+    """
+    by_endpoint = defaultdict(list)
+    for outcome in outcomes:
+        by_endpoint[outcome.endpoint].append(outcome)
+
+    report = {}
+    for endpoint, endpoint_outcomes in sorted(by_endpoint.items()):
+        latencies = sorted(outcome.latency for outcome in endpoint_outcomes)
+        errors = sum(
+            outcome.status_code is None or outcome.status_code >= 400
+            for outcome in endpoint_outcomes
+        )
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for latency in latencies:
+            bucket = next(
+                (i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if latency * 1000 <= bound),
+                len(HISTOGRAM_BOUNDS_MS),
+            )
+            histogram[bucket] += 1
+        status_codes = defaultdict(int)
+        for outcome in endpoint_outcomes:
+            status_codes[str(outcome.status_code)] += 1
+
+        summary = {"requests": len(latencies), "errors": errors}
+        summary["error_rate"] = errors / len(latencies)
+        for q in PERCENTILES:
+            summary[f"p{q}_ms"] = percentile(latencies, q) * 1000
+        summary["max_ms"] = latencies[-1] * 1000
+        summary["status_codes"] = dict(status_codes)
+        summary["histogram_ms"] = {
+            f"<={bound}": count for bound, count in zip(HISTOGRAM_BOUNDS_MS, histogram)
+        }
+        summary["histogram_ms"][f">{HISTOGRAM_BOUNDS_MS[-1]}"] = histogram[-1]
+        report[endpoint] = summary
+    return report
+
+
+async def run(args: argparse.Namespace, requests: list[RecordedRequest]) -> tuple:
+    import httpx
+
+    if args.url is not None:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            return await replay(client, requests, args.speed, args.concurrency)
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            return await replay(client, requests, args.speed, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("recording", type=Path, help="JSON Lines file of recorded requests")
+    parser.add_argument("--url", help="Base URL of a running API, in-process if unset")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at most")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Time scaling, 0 to send as fast as possible"
+    )
+    parser.add_argument("--output", type=Path, help="File to write the report to, as JSON")
+    args = parser.parse_args()
+
+    requests, skipped = read_recording(args.recording)
+    if skipped:
+        print(f"Skipped {skipped} lines without method and path", file=sys.stderr)
+    if not requests:
+        sys.exit(f"No requests to replay in {args.recording}")
+
+    outcomes, duration, max_lag = asyncio.run(run(args, requests))
+    endpoints = summarize(outcomes)
+
+    print(
+        f"{len(outcomes)} requests in {duration:.2f} s ({len(outcomes) / duration:.1f} req/s),"
+        f" at most {max_lag * 1000:.1f} ms behind schedule"
+    )
+    for endpoint, summary in endpoints.items():
+        print(
+            f"  {endpoint:<50} {summary['requests']:7}  p50 {summary['p50_ms']:9.2f} ms"
+            f"  p99 {summary['p99_ms']:9.2f} ms  {summary['error_rate']:6.1%} errors"
+        )
+        histogram = "  ".join(
+            f"{bucket}:{count}" for bucket, count in summary["histogram_ms"].items() if count
+        )
+        print(f"  {'':<50} ms {histogram}")
+
+    if args.output is not None:
+        report = {
+            "recording": str(args.recording),
+            "speed": args.speed,
+            "concurrency": args.concurrency,
+            "requests": len(outcomes),
+            "duration_s": duration,
+            "max_lag_ms": max_lag * 1000,
+            "endpoints": endpoints,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
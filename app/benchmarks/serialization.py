@@ -0,0 +1,74 @@
+"""
+Compare the rendering cost of the connector listings, with Pydantic and with the fast JSON path.
+
+Run from the app directory:
+
+    python -m benchmarks.serialization --connectors 100000
+"""
+
+import argparse
+from time import perf_counter
+
+from benchmarks.generate import generate
+from fake_data.store import ConnectorStore
+from models.connectors import Connector
+from models.connectors_and_sources import ConnectorsAndSourcesList, ConnectorSource
+from utils.fast_json import RenderedConnectorsList, dump_json
+
+
+def build_store(size: int, seed: int = 0) -> ConnectorStore:
+    """
+    Fill a store with `size` synthetic connectors and their sources.
+    """
+    connectors, sources = [], []
+    for connector_uuid, connector_sources in generate(size, seed):
+        connectors.append(Connector(uuid=connector_uuid))
+        sources.extend(
+            ConnectorSource(
+                connector_uuid=connector_uuid, uuid=uuid, type=type, available=available
+            )
+            for uuid, type, available in connector_sources
+        )
+    store = ConnectorStore()
+    store.load(connectors, sources)
+    return store
+
+
+def render_pydantic(store: ConnectorStore) -> bytes:
+    connectors = store.list_connectors_and_sources()
+    return ConnectorsAndSourcesList(connectors=connectors).model_dump_json().encode()
+
+
+def render_fast(store: ConnectorStore) -> bytes:
+    connectors = store.list_connectors_and_sources(rendered=True)
+    return dump_json(RenderedConnectorsList(connectors=connectors))
+
+
+def best_of(repeat: int, render, store: ConnectorStore) -> tuple[float, bytes]:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        body = render(store)
+        timings.append(perf_counter() - start)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connectors", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    store = build_store(args.connectors)
+    pydantic_time, pydantic_body = best_of(args.repeat, render_pydantic, store)
+    fast_time, fast_body = best_of(args.repeat, render_fast, store)
+    if fast_body != pydantic_body:
+        raise SystemExit("The fast JSON path does not render the same bytes")
+
+    print(f"{args.connectors} connectors, {len(fast_body) / 1e6:.1f} MB, best of {args.repeat}")
+    print(f"  pydantic  {pydantic_time * 1000:9.1f} ms")
+    print(f"  fast json {fast_time * 1000:9.1f} ms  ({pydantic_time / fast_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Stress test of the store under concurrent readers and writers, checking what readers see.
+
+Reader threads list pages (filtered or not, by offset or cursor), and get single
+connectors, while writer threads toggle sources in bulk or conditionally on their version,
+delete and recreate sources, and add and delete connectors. Readers check that:
+
+- calls never raise;
+- pages are sorted by UUID, without duplicates;
+- listed connectors match the filter they were listed with;
+- connectors never have two sources of the same type or with the same UUID.
+
+Once the threads are done, the indexes are checked against the stored sources. The GIL
+switch interval is lowered, so that threads interleave at a fine grain.
+
+The API is then checked for a write committing while a GET holds its registry snapshot:
+the GET may answer with the version before the write, but must not leave that body in the
+response cache, where later GETs would find it. Last, many more GETs than there are worker
+threads are sent at once, and must all be answered. Run from the app directory:
+
+    python -m benchmarks.stress --size 10000 --readers 8 --writers 4 --duration 10
+    CONREG_BACKEND=sqlite python -m benchmarks.stress
+
+Exits with an error when a check failed.
+"""
+
+import argparse
+import atexit
+import os
+import random
+import sys
+import tempfile
+import traceback
+from collections import Counter
+from contextlib import asynccontextmanager
+from itertools import chain
+from pathlib import Path
+from threading import Event, Thread
+from time import perf_counter
+from uuid import UUID
+
+import anyio
+import httpx
+from benchmarks.generate import generate
+from fake_data.store import VersionConflictError
+from models.connectors import Connector
+from models.connectors_and_sources import ConnectorsFilter, ConnectorSource, TypeEnum
+
+FILTERS = [
+    None,
+    ConnectorsFilter(type=TypeEnum.OPENAPI),
+    ConnectorsFilter(type=TypeEnum.FALLBACK, available=False),
+    ConnectorsFilter(available=True),
+    ConnectorsFilter(has_available_source=False),
+]
+PAGE_SIZE = 50
+# Errors reported per check at most, the following ones are only counted
+REPORTED_ERRORS = 5
+# GETs sent at once to the API, more than the 40 worker threads of anyio
+CONCURRENT_REQUESTS = 200
+# Seconds after which concurrent GETs still unanswered are considered hung
+CONCURRENT_TIMEOUT = 30
+
+
+class Checks:
+    def __init__(self):
+        self.operations = Counter()
+        self.errors = Counter()
+
+    def fail(self, check: str, detail: str):
+        self.errors[check] += 1
+        if self.errors[check] <= REPORTED_ERRORS:
+            print(f"{check}: {detail}", file=sys.stderr)
+
+
+def build_store(backend: str, size: int, seed: int):
+    from fake_data.sql import SQLiteStore
+    from fake_data.store import ConnectorStore
+
+    connectors, sources = [], []
+    for connector_uuid, connector_sources in generate(size, seed):
+        connectors.append(Connector(uuid=connector_uuid))
+        sources.extend(
+            ConnectorSource(
+                connector_uuid=connector_uuid, uuid=uuid, type=type, available=available
+            )
+            for uuid, type, available in connector_sources
+        )
+    if backend == "sqlite":
+        # Pooled connections only share a database file, dropped at exit
+        directory = tempfile.TemporaryDirectory()
+        atexit.register(directory.cleanup)
+        store = SQLiteStore(Path(directory.name) / "stress.db", pool_size=8)
+    else:
+        store = ConnectorStore()
+    store.load(connectors, sources)
+    return store, [connector.uuid for connector in connectors]
+
+
+def matches(filter: ConnectorsFilter, sources: list[ConnectorSource]) -> bool:
+    """
+    Tell whether a connector with the given sources matches the filter, from its sources
+    rather than the indexes the stores filter with.
+    """
+    if filter.type is not None or filter.available is not None:
+        if not any(
+            (filter.type is None or source.type == filter.type)
+            and (filter.available is None or source.available == filter.available)
+            for source in sources
+        ):
+            return False
+    if filter.has_available_source is not None:
+        return any(source.available for source in sources) == filter.has_available_source
+    return True
+
+
+def check_connector(checks: Checks, connector, filter: ConnectorsFilter | None):
+    sources = connector.sources
+    if len({source.type for source in sources}) != len(sources):
+        checks.fail("duplicate type", f"{connector.uuid}: {sources}")
+    if len({source.uuid for source in sources}) != len(sources):
+        checks.fail("duplicate source UUID", f"{connector.uuid}: {sources}")
+    if filter is not None and not matches(filter, sources):
+        checks.fail("filter mismatch", f"{connector.uuid} listed for {filter}: {sources}")
+
+
+def read(store, connector_uuids: list[UUID], checks: Checks, rng: random.Random):
+    operation = rng.random()
+    filter = rng.choice(FILTERS)
+    if operation < 0.4:
+        checks.operations["list"] += 1
+        connectors = store.list_connectors_and_sources(
+            offset=rng.randrange(len(connector_uuids)), limit=PAGE_SIZE, filter=filter
+        )
+    elif operation < 0.8:
+        checks.operations["list_after"] += 1
+        connectors = store.list_connectors_and_sources_after(
+            rng.choice(connector_uuids), limit=PAGE_SIZE, filter=filter
+        )
+    elif operation < 0.95:
+        checks.operations["get"] += 1
+        connector = store.get_connector_and_sources(rng.choice(connector_uuids))
+        connectors, filter = ([] if connector is None else [connector]), None
+    else:
+        checks.operations["list_connectors"] += 1
+        uuids = [connector.uuid for connector in store.list_connectors()]
+        if len(set(uuids)) != len(uuids):
+            checks.fail("duplicate connector", "in list_connectors")
+        return
+
+    uuids = [connector.uuid.int for connector in connectors]
+    if uuids != sorted(set(uuids)):
+        checks.fail("unsorted page", f"{len(uuids)} connectors")
+    for connector in connectors:
+        check_connector(checks, connector, filter)
+
+
+def write(store, connector_uuids: list[UUID], checks: Checks, rng: random.Random):
+    operation = rng.random()
+    if operation < 0.7:
+        # Bulk toggle, as PATCH /connectors does
+        checks.operations["upsert_sources"] += 1
+        sources = chain.from_iterable(
+            store.list_sources(connector_uuid) for connector_uuid in rng.sample(connector_uuids, 5)
+        )
+        store.upsert_sources(
+            source.model_copy(update={"available": not source.available}) for source in sources
+        )
+    elif operation < 0.8:
+        # Conditional toggle, as PATCH /connectors/{uuid}/sources/{type} with If-Match does
+        checks.operations["upsert_source_if_version"] += 1
+        sources = store.list_sources(rng.choice(connector_uuids))
+        if sources:
+            source = rng.choice(sources)
+            version = store.get_source_version(source.connector_uuid, source.type)
+            try:
+                store.upsert_source(
+                    source.model_copy(update={"available": not source.available}),
+                    if_version=version,
+                )
+            except VersionConflictError:
+                checks.operations["version_conflict"] += 1
+                return
+            if store.get_source_version(source.connector_uuid, source.type) <= version:
+                checks.fail("version not bumped", f"{source} was at version {version}")
+    elif operation < 0.9:
+        checks.operations["delete_source"] += 1
+        connector_uuid = rng.choice(connector_uuids)
+        sources = store.list_sources(connector_uuid)
+        if sources:
+            source = rng.choice(sources)
+            store.delete_source(connector_uuid, source.type)
+            store.upsert_source(source)
+    else:
+        # Connectors that are not part of the seed, so that readers do not look them up
+        checks.operations["upsert_delete_connector"] += 1
+        connector_uuid = UUID(int=rng.getrandbits(128))
+        store.upsert_connector(Connector(uuid=connector_uuid))
+        store.upsert_source(
+            ConnectorSource(
+                connector_uuid=connector_uuid,
+                uuid=UUID(int=rng.getrandbits(128)),
+                type=rng.choice(list(TypeEnum)),
+                available=rng.random() < 0.5,
+            )
+        )
+        store.delete_connector(connector_uuid)
+
+
+def worker(operation, store, connector_uuids, checks: Checks, seed: int, stop: Event):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        try:
+            operation(store, connector_uuids, checks, rng)
+        except Exception as error:
+            checks.fail(f"{type(error).__name__} in {operation.__name__}", repr(error))
+            if checks.errors[f"{type(error).__name__} in {operation.__name__}"] == 1:
+                traceback.print_exc()
+
+
+def check_indexes(store, checks: Checks):
+    """
+    Check that a filtered listing of the whole store returns what a scan of its data finds.
+    """
+    connectors = store.list_connectors_and_sources()
+    for filter in FILTERS[1:]:
+        expected = [
+            connector.uuid for connector in connectors if matches(filter, connector.sources)
+        ]
+        listed = [connector.uuid for connector in store.list_connectors_and_sources(filter=filter)]
+        if listed != expected:
+            checks.fail("index mismatch", f"{filter}: {len(listed)} listed, {len(expected)} match")
+
+
+def check_api(checks: Checks):
+    """
+    Run the checks of the API, on the registry loaded by the app.
+    """
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as client:
+        check_racing_reads(client, checks)
+        check_concurrent_reads(client, checks)
+
+
+def check_racing_reads(client, checks: Checks):
+    """
+    Commit a source toggle while GETs hold their snapshot, then check the next GETs see it.
+    """
+    from routers.connectors_and_sources import REPOSITORY
+
+    connector = next(
+        connector
+        for connector in client.get("/connectors?limit=50").json()["connectors"]
+        if connector["sources"]
+    )
+    connector_uuid = UUID(connector["uuid"])
+    paths = [f"/connectors/{connector_uuid}", "/connectors?all=true", "/connectors?limit=50"]
+    snapshot = REPOSITORY.snapshot
+
+    @asynccontextmanager
+    async def racing_snapshot():
+        async with snapshot() as registry:
+            source = await registry.get_source(connector_uuid, connector["sources"][0]["type"])
+            await REPOSITORY.upsert_source(
+                source.model_copy(update={"available": not source.available})
+            )
+            yield registry
+
+    for path in paths:
+        # Cache the body, then race a GET with the toggle
+        client.get(path)
+        REPOSITORY.snapshot = racing_snapshot
+        try:
+            client.get(path)
+        finally:
+            del REPOSITORY.snapshot
+        checks.operations["racing_get"] += 1
+
+        expected = REPOSITORY.store.get_connector_and_sources(connector_uuid).model_dump(
+            mode="json"
+        )
+        for _ in range(2):
+            response = client.get(path)
+            body = response.json()
+            if "connectors" in body:
+                body = next(c for c in body["connectors"] if c["uuid"] == str(connector_uuid))
+            served = body
+            if served != expected:
+                checks.fail("stale cached response", f"{path}: {served} != {expected}")
+            if response.headers["x-registry-version"] != str(REPOSITORY.store.version):
+                checks.fail("stale registry version", f"{path}: {response.headers}")
+
+
+def check_concurrent_reads(client, checks: Checks):
+    """
+    Send many GETs at once, each holding a registry snapshot, and check they are all answered.
+    """
+    connector_uuids = [
+        connector["uuid"] for connector in client.get("/connectors?limit=50").json()["connectors"]
+    ]
+    paths = [f"/connectors/{connector_uuid}" for connector_uuid in connector_uuids]
+    paths += ["/connectors?limit=50", "/connectors?type=openapi&limit=10"]
+    statuses = Counter()
+
+    async def get(http: httpx.AsyncClient, path: str):
+        statuses[(await http.get(path)).status_code] += 1
+
+    async def get_all():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress") as http:
+            async with anyio.create_task_group() as tasks:
+                for i in range(CONCURRENT_REQUESTS):
+                    tasks.start_soon(get, http, paths[i % len(paths)])
+
+    # Run in the loop of the app, waited for from here since hung requests cannot be cancelled
+    future = client.portal.start_task_soon(get_all)
+    try:
+        future.result(timeout=CONCURRENT_TIMEOUT)
+    except TimeoutError:
+        checks.fail(
+            "hung requests",
+            f"{CONCURRENT_REQUESTS - statuses.total()} of {CONCURRENT_REQUESTS} concurrent GETs"
+            f" unanswered after {CONCURRENT_TIMEOUT} s",
+        )
+        # Neither would the app shut down
+        os._exit(1)
+    checks.operations["concurrent_get"] += statuses.total()
+    if statuses.keys() != {200}:
+        checks.fail("concurrent GET failed", f"status codes {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10000, help="Number of connectors")
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads")
+    parser.add_argument("--writers", type=int, default=4, help="Writer threads")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run for")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of data and operations")
+    parser.add_argument(
+        "--switch-interval", type=float, default=1e-5, help="GIL switch interval in seconds"
+    )
+    args = parser.parse_args()
+
+    # The API checks run against a database of their own
+    directory = tempfile.TemporaryDirectory()
+    atexit.register(directory.cleanup)
+    os.environ.setdefault("CONREG_SQLITE_PATH", str(Path(directory.name) / "api.db"))
+    from config import BACKEND
+
+    store, connector_uuids = build_store(BACKEND, args.size, args.seed)
+    checks = Checks()
+    stop = Event()
+    threads = [
+        Thread(target=worker, args=(read, store, connector_uuids, checks, args.seed + i, stop))
+        for i in range(args.readers)
+    ] + [
+        Thread(target=worker, args=(write, store, connector_uuids, checks, -args.seed - i, stop))
+        for i in range(1, args.writers + 1)
+    ]
+
+    sys.setswitchinterval(args.switch_interval)
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    check_indexes(store, checks)
+    check_api(checks)
+
+    print(
+        f"{BACKEND} store, {args.size} connectors, {args.readers} readers and {args.writers}"
+        f" writers for {elapsed:.1f} s"
+    )
+    for operation, count in sorted(checks.operations.items()):
+        print(f"  {operation:<24} {count:9} ({count / elapsed:9.1f}/s)")
+    if checks.errors:
+        for check, count in checks.errors.most_common():
+            print(f"  FAILED {check}: {count}")
+        sys.exit(1)
+    print("  all checks passed")
+
+
+if __name__ == "__main__":
+    main()
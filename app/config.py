@@ -0,0 +1,58 @@
+import os
+
+# Maximum number of serialized responses kept by the response cache, 0 disables it
+RESPONSE_CACHE_SIZE = int(os.environ.get("CONREG_RESPONSE_CACHE_SIZE", "1024"))
+
+# Number of registry changes kept for GET /connectors/changes consumers
+CHANGELOG_SIZE = int(os.environ.get("CONREG_CHANGELOG_SIZE", "10000"))
+
+# Directory holding the connectors.json and sources.json seed files, the fake_data ones if unset
+SEED_DIR = os.environ.get("CONREG_SEED_DIR")
+
+# Directory where the registry is persisted (snapshot + write-ahead log), in memory only if unset
+DATA_DIR = os.environ.get("CONREG_DATA_DIR")
+# Interval in seconds between two write-ahead log fsyncs, writes in between are committed together
+WAL_SYNC_INTERVAL = float(os.environ.get("CONREG_WAL_SYNC_INTERVAL", "0.01"))
+# Number of write-ahead log records after which a new snapshot is written
+SNAPSHOT_INTERVAL = int(os.environ.get("CONREG_SNAPSHOT_INTERVAL", "10000"))
+
+# File shared by the uvicorn workers to replicate registry writes (e.g. under /dev/shm),
+# each worker only sees its own writes if unset
+SHARED_REGISTRY_PATH = os.environ.get("CONREG_SHARED_REGISTRY")
+# Number of writes kept in the shared log, workers lagging further behind resync from a table
+SHARED_REGISTRY_CAPACITY = int(os.environ.get("CONREG_SHARED_REGISTRY_CAPACITY", "1000000"))
+# Interval in seconds between two checks for writes of the other workers
+SHARED_REGISTRY_POLL_INTERVAL = float(
+    os.environ.get("CONREG_SHARED_REGISTRY_POLL_INTERVAL", "0.05")
+)
+
+# Storage backend of the registry: "memory" (default) or "sqlite"
+BACKEND = os.environ.get("CONREG_BACKEND", "memory")
+# SQLite database file (":memory:" for a transient one), seeded from the fixtures when empty
+SQLITE_PATH = os.environ.get("CONREG_SQLITE_PATH", "conreg.db")
+# Number of pooled SQLite connections, i.e. of concurrent queries
+SQLITE_POOL_SIZE = int(os.environ.get("CONREG_SQLITE_POOL_SIZE", "8"))
+
+# Render the connectors as JSON straight from the store records rather than through Pydantic
+# models, the responses are the same bytes
+FAST_JSON = os.environ.get("CONREG_FAST_JSON", "").lower() in ("1", "true", "yes")
+# Have FastAPI validate the models returned by the handlers against their response_model, they
+# are otherwise serialized as is since the handlers only return models they built themselves.
+# The cached responses and the connectors rendered without models (CONREG_FAST_JSON) are
+# validated against it when they are rendered, cache hits are served as they were validated.
+VALIDATE_RESPONSES = os.environ.get("CONREG_VALIDATE_RESPONSES", "").lower() in ("1", "true", "yes")
+
+# Reject the source PATCHes without an If-Match header with a 428, they otherwise overwrite
+# the source whatever its version
+REQUIRE_IF_MATCH = os.environ.get("CONREG_REQUIRE_IF_MATCH", "").lower() in ("1", "true", "yes")
+
+# Record per-route request metrics, exposed with the registry ones on GET /metrics
+METRICS = os.environ.get("CONREG_METRICS", "true").lower() in ("1", "true", "yes")
+
+# Debug setting allowing requests to be profiled, with an X-Profile: 1 header or sampled at
+# PROFILING_SAMPLE_RATE, their profiles being served on /debug/profiles. Off in production.
+PROFILING = os.environ.get("CONREG_PROFILING", "").lower() in ("1", "true", "yes")
+# Share of the requests profiled without the header, between 0 and 1
+PROFILING_SAMPLE_RATE = float(os.environ.get("CONREG_PROFILING_SAMPLE_RATE", "0"))
+# Number of profiles kept in memory, the oldest ones are dropped first
+PROFILE_STORE_SIZE = int(os.environ.get("CONREG_PROFILE_STORE_SIZE", "100"))
@@ -0,0 +1,105 @@
+import asyncio
+from collections import deque
+from itertools import islice
+from threading import Lock
+from uuid import UUID
+
+from fake_data.store import ConnectorStore
+from models.connectors_and_sources import RegistryChange
+
+
+class ChangesExpired(Exception):
+    """
+    Raised when the requested changes were already dropped from the change log.
+    """
+
+
+class ChangeLog:
+    """
+    Append-only log of the store mutations, kept in a bounded ring buffer.
+
+    Each change is numbered with the store version it produced, so that consumers can
+    fetch a full listing, then follow the changes from its ETag on. Async consumers can
+    wait for new changes, mutations may happen on any thread.
+    """
+
+    def __init__(self, store: ConnectorStore, maxlen: int):
+        self._store = store
+        self._changes: deque[RegistryChange] = deque(maxlen=maxlen)
+        # Changes up to this sequence number are not available (anymore)
+        self._first_seq = store.version
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = Lock()
+
+    @property
+    def epoch(self) -> str:
+        # Sequence numbers are store versions, only unique within its epoch
+        return self._store.epoch
+
+    @property
+    def last_seq(self) -> int:
+        return self._changes[-1].seq if self._changes else self._first_seq
+
+    def append(self, connector_uuid: UUID | None, structural: bool = False):
+        """
+        Record the current state of a connector that changed.
+
+        Store change listener: when everything changed, the log is reset and consumers
+        have to resync from a full listing.
+        """
+        with self._lock:
+            if connector_uuid is None:
+                self._changes.clear()
+                self._first_seq = self._store.version
+            else:
+                connector = self._store.get_connector_and_sources(connector_uuid)
+                self._changes.append(
+                    RegistryChange(
+                        seq=self._store.version,
+                        connector_uuid=connector_uuid,
+                        deleted=connector is None,
+                        # The store builds a new model on every read
+                        connector=connector,
+                    )
+                )
+            if len(self._changes) == self._changes.maxlen:
+                self._first_seq = self._changes[0].seq - 1
+            waiters = list(self._waiters)
+
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def since(self, seq: int, limit: int | None = None) -> list[RegistryChange]:
+        """
+        Return the changes after the given sequence number, oldest first.
+
+        Raises ChangesExpired if some of them were already dropped from the log, or if the
+        sequence number was never reached, as the consumer would miss the changes up to it.
+        """
+        with self._lock:
+            if not self._first_seq <= seq <= self.last_seq:
+                raise ChangesExpired(seq)
+            # Sequence numbers are contiguous, only read the tail of the buffer
+            count = self.last_seq - seq
+            changes = list(islice(reversed(self._changes), count))
+        changes.reverse()
+        return changes if limit is None else changes[:limit]
+
+    async def wait(self, seq: int, timeout: float) -> bool:
+        """
+        Wait until there are changes after the given sequence number, or the timeout expires.
+        """
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            if self.last_seq > seq:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
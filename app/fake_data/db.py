@@ -1,14 +1,68 @@
-import json
+import asyncio
 from contextlib import asynccontextmanager
-from pathlib import Path
+from time import perf_counter
 
+from config import (
+    BACKEND,
+    CHANGELOG_SIZE,
+    DATA_DIR,
+    SHARED_REGISTRY_CAPACITY,
+    SHARED_REGISTRY_PATH,
+    SHARED_REGISTRY_POLL_INTERVAL,
+    SNAPSHOT_INTERVAL,
+    SQLITE_PATH,
+    SQLITE_POOL_SIZE,
+    WAL_SYNC_INTERVAL,
+)
+from fake_data.changelog import ChangeLog
+from fake_data.loader import SEED_DIR, load_models
+from fake_data.persistence import Persistence
+from fake_data.repository import ConnectorRepository, InMemoryRepository
+from fake_data.shared import SharedRegistry
+from fake_data.sql import SQLiteRepository, SQLiteStore
+from fake_data.store import ConnectorStore
 from fastapi import FastAPI
 from models.connectors import Connector
-from models.connectors_and_sources import ConnectorAndSources, ConnectorSource
+from models.connectors_and_sources import ConnectorSource
 
-# DB placeholders for model objects
-CONNECTORS_DB = []
-SOURCES_DB = []
+if BACKEND not in ("memory", "sqlite"):
+    raise RuntimeError(f"Unknown CONREG_BACKEND {BACKEND!r}, expected 'memory' or 'sqlite'")
+if BACKEND == "sqlite" and (DATA_DIR is not None or SHARED_REGISTRY_PATH is not None):
+    raise RuntimeError(
+        "CONREG_DATA_DIR and CONREG_SHARED_REGISTRY only apply to the 'memory' backend"
+    )
+
+# Indexed store for connectors and their sources, in memory or in a SQLite database
+STORE: ConnectorStore | SQLiteStore = (
+    SQLiteStore(SQLITE_PATH, pool_size=SQLITE_POOL_SIZE)
+    if BACKEND == "sqlite"
+    else ConnectorStore()
+)
+# Feed of the store mutations, for consumers keeping a replica of the registry
+CHANGELOG = ChangeLog(STORE, maxlen=CHANGELOG_SIZE)
+STORE.subscribe(CHANGELOG.append)
+# Durable storage of the store, when a data directory is configured
+PERSISTENCE = (
+    Persistence(
+        STORE, DATA_DIR, sync_interval=WAL_SYNC_INTERVAL, snapshot_interval=SNAPSHOT_INTERVAL
+    )
+    if DATA_DIR is not None
+    else None
+)
+# Replication of the writes between uvicorn workers, when a shared file is configured
+if SHARED_REGISTRY_PATH is not None and DATA_DIR is not None:
+    raise RuntimeError("CONREG_SHARED_REGISTRY and CONREG_DATA_DIR cannot be used together")
+SHARED_REGISTRY = (
+    SharedRegistry(STORE, SHARED_REGISTRY_PATH, capacity=SHARED_REGISTRY_CAPACITY)
+    if SHARED_REGISTRY_PATH is not None
+    else None
+)
+# Access to the registry for the routers
+REPOSITORY: ConnectorRepository = (
+    SQLiteRepository(STORE)
+    if BACKEND == "sqlite"
+    else InMemoryRepository(STORE, shared=SHARED_REGISTRY)
+)
 # CONNECTORS_AND_SOURCES_DB = []
 
 # other way to define the data
@@ -29,13 +83,48 @@ SOURCES_DB = []
 # Load data on application startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    connectors_file_path = Path(__file__).parent / "connectors.json"
-    with connectors_file_path.open() as f:
-        fake_connectors_data = json.load(f)
+    start = perf_counter()
+    if PERSISTENCE is not None and PERSISTENCE.restore():
+        print(
+            f"\n\n\t\t>>>>>> Connectors and sources restored from {DATA_DIR}"
+            f" in {(perf_counter() - start) * 1000:.1f} ms\n\n"
+        )
+    elif BACKEND == "sqlite" and len(STORE):
+        print(f"\n\n\t\t>>>>>> Connectors and sources stored in {SQLITE_PATH}\n\n")
+    else:
+        load_seed()
+
+    if PERSISTENCE is not None:
+        PERSISTENCE.start()
+    poll_task = None
+    if SHARED_REGISTRY is not None:
+        SHARED_REGISTRY.attach()
+        # Wake up the change feed consumers on writes of the other workers
+        poll_task = asyncio.create_task(poll_shared_registry())
+
+    yield
+
+    if poll_task is not None:
+        poll_task.cancel()
+        SHARED_REGISTRY.close()
+    if PERSISTENCE is not None:
+        PERSISTENCE.stop()
+    if BACKEND == "sqlite":
+        STORE.close()
 
-    for connector in fake_connectors_data:
-        CONNECTORS_DB.append(Connector.model_validate(connector))
-    print("\n\n\t\t>>>>>> Connectors data loaded successfully!\n\n")
+
+async def poll_shared_registry():
+    while True:
+        SHARED_REGISTRY.sync()
+        await asyncio.sleep(SHARED_REGISTRY_POLL_INTERVAL)
+
+
+def load_seed():
+    connectors, file_name, duration = load_models(SEED_DIR / "connectors.json", Connector)
+    print(
+        f"\n\n\t\t>>>>>> Connectors data loaded successfully!"
+        f" ({len(connectors)} rows from {file_name} in {duration * 1000:.1f} ms)\n\n"
+    )
 
     # connector_sources_file_path = Path(__file__).parent / "connector_sources.json"
     # with connector_sources_file_path.open() as f:
@@ -45,13 +134,19 @@ async def lifespan(app: FastAPI):
     #     SOURCES_DB.append(ConnectorSource.model_validate(source))
     # print("\n\n\t\t>>>>>> Connector sources data loaded successfully!\n\n")
 
-    sources_file_path = Path(__file__).parent / "sources.json"
-    with sources_file_path.open() as f:
-        fake_sources_data = json.load(f)
+    sources, file_name, duration = load_models(SEED_DIR / "sources.json", ConnectorSource)
+    print(
+        f"\n\n\t\t>>>>>> Connector sources data loaded successfully!"
+        f" ({len(sources)} rows from {file_name} in {duration * 1000:.1f} ms)\n\n"
+    )
 
-    for source in fake_sources_data:
-        SOURCES_DB.append(ConnectorSource.model_validate(source))
-    print("\n\n\t\t>>>>>> Connector sources data loaded successfully!\n\n")
+    # Sources of unknown connectors were never exposed, the store skips them
+    start = perf_counter()
+    STORE.load(connectors, sources)
+    print(
+        "\n\n\t\t>>>>>> Connectors and sources indexed"
+        f" in {(perf_counter() - start) * 1000:.1f} ms\n\n"
+    )
 
     # connectors_and_sources_file_path = Path(__file__).parent / "connectors_and_sources.json"
     # with connectors_and_sources_file_path.open() as f:
@@ -61,5 +156,3 @@ async def lifespan(app: FastAPI):
     #     CONNECTORS_AND_SOURCES_DB.append(ConnectorAndSources.parse_obj(con))
     # print("\n\n\t\t>>>>>> Connectors and sources data loaded successfully!\n\n")
     # print(CONNECTORS_AND_SOURCES_DB)
-
-    yield
@@ -0,0 +1,103 @@
+"""
+Loader for the fake_data seed files.
+
+Seed files are JSON arrays validated in one shot through a cached TypeAdapter. They can
+also be precompiled into binary snapshots, read instead of the JSON file while it is not
+modified, which skips JSON and UUID strings parsing:
+
+    python -m fake_data.loader
+"""
+
+import pickle
+from enum import Enum
+from functools import cache
+from pathlib import Path
+from time import perf_counter
+from uuid import UUID
+
+from config import SEED_DIR as SEED_DIR_SETTING
+from models.connectors import Connector
+from models.connectors_and_sources import ConnectorSource
+from pydantic import BaseModel, TypeAdapter
+
+SEED_DIR = Path(SEED_DIR_SETTING or Path(__file__).parent)
+SNAPSHOT_SUFFIX = ".snapshot"
+# Bumped whenever the snapshot layout changes, older snapshots are then ignored
+SNAPSHOT_FORMAT = 1
+
+
+@cache
+def list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+def load_models(path: Path, model: type[BaseModel]) -> tuple[list[BaseModel], str, float]:
+    """
+    Load and validate a seed file as a list of models.
+
+    Returns the models, the name of the file actually read, and the time it took in seconds.
+    """
+    start = perf_counter()
+    snapshot_path = path.with_suffix(SNAPSHOT_SUFFIX)
+    if snapshot_path.exists() and snapshot_path.stat().st_mtime >= path.stat().st_mtime:
+        models = read_snapshot(snapshot_path, model)
+        if models is not None:
+            return models, snapshot_path.name, perf_counter() - start
+
+    models = list_adapter(model).validate_json(path.read_bytes())
+    return models, path.name, perf_counter() - start
+
+
+def write_snapshot(path: Path, model: type[BaseModel]) -> Path:
+    """
+    Compile a JSON seed file into a binary snapshot next to it.
+
+    Rows are stored as tuples of plain values: UUIDs as 128-bit ints and enums as their values.
+    """
+    models = list_adapter(model).validate_json(path.read_bytes())
+    fields = tuple(model.model_fields)
+    rows = [tuple(_encode(getattr(instance, field)) for field in fields) for instance in models]
+    snapshot_path = path.with_suffix(SNAPSHOT_SUFFIX)
+    with snapshot_path.open("wb") as f:
+        pickle.dump((SNAPSHOT_FORMAT, fields, rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+    return snapshot_path
+
+
+def read_snapshot(path: Path, model: type[BaseModel]) -> list[BaseModel] | None:
+    """
+    Read a snapshot written by write_snapshot, None if it is outdated.
+    """
+    with path.open("rb") as f:
+        snapshot_format, fields, rows = pickle.load(f)
+    if snapshot_format != SNAPSHOT_FORMAT or fields != tuple(model.model_fields):
+        return None
+
+    # UUIDs are rebuilt from ints, and shared when repeated (e.g. the connector UUID of
+    # sources), everything else is left to the validator
+    uuid_columns = [
+        i for i, field in enumerate(fields) if model.model_fields[field].annotation is UUID
+    ]
+    uuids = {}
+    data = []
+    for row in rows:
+        row = list(row)
+        for i in uuid_columns:
+            uuid = uuids.get(row[i])
+            if uuid is None:
+                uuid = uuids[row[i]] = UUID(int=row[i])
+            row[i] = uuid
+        data.append(dict(zip(fields, row)))
+    return list_adapter(model).validate_python(data)
+
+
+def _encode(value):
+    if isinstance(value, UUID):
+        return value.int
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+if __name__ == "__main__":
+    for file_name, model in (("connectors.json", Connector), ("sources.json", ConnectorSource)):
+        print(f"Snapshot written to {write_snapshot(SEED_DIR / file_name, model)}")
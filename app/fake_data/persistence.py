@@ -0,0 +1,256 @@
+import json
+import os
+from pathlib import Path
+from threading import Condition, Lock, Thread
+from uuid import UUID
+
+from fake_data.store import ConnectorStore
+from models.connectors import Connector
+from models.connectors_and_sources import ConnectorSource
+
+SNAPSHOT_FILE_NAME = "snapshot.json"
+WAL_FILE_PREFIX = "wal-"
+WAL_FILE_SUFFIX = ".log"
+
+
+class Persistence:
+    """
+    Durable storage of a ConnectorStore, as a snapshot plus a write-ahead log.
+
+    Every mutation of the store is appended to the log as one JSON line, holding the
+    sequence number (the store version) and the full state of the connector after it,
+    so that replaying a record is idempotent. Records are buffered and written by a
+    background thread which fsyncs them together every `sync_interval` seconds (group
+    commit): writes never wait for the disk, and at most the last interval is lost on
+    a crash.
+
+    Every `snapshot_interval` records, the log is rotated and a compact snapshot of the
+    whole store is written, then the previous log files are removed.
+    """
+
+    def __init__(
+        self,
+        store: ConnectorStore,
+        data_dir: str | Path,
+        sync_interval: float,
+        snapshot_interval: int,
+    ):
+        self.store = store
+        self.data_dir = Path(data_dir)
+        self.sync_interval = sync_interval
+        self.snapshot_interval = snapshot_interval
+        self._buffer: list[str] = []
+        self._records_since_snapshot = 0
+        self._checkpoint_requested = False
+        self._wal_file = None
+        self._running = False
+        self._thread: Thread | None = None
+        # Guards the buffer and flags, and the log file respectively, so that
+        # writers never wait for an fsync
+        self._cond = Condition()
+        self._io_lock = Lock()
+
+    ##
+    ##? Startup and shutdown
+    ##
+
+    def restore(self) -> bool:
+        """
+        Load the store from the snapshot and replay the log on top of it.
+
+        Returns False if nothing was persisted yet.
+        """
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        snapshot_path = self.data_dir / SNAPSHOT_FILE_NAME
+        wal_paths = self._wal_paths()
+        if not snapshot_path.exists() and not wal_paths:
+            return False
+
+        records: dict[UUID, dict | None] = {}
+        version = 0
+        if snapshot_path.exists():
+            snapshot = json.loads(snapshot_path.read_bytes())
+            version = snapshot["version"]
+            for record in snapshot["connectors"]:
+                records[UUID(record["uuid"])] = record
+
+        last_seq = version
+        for i, wal_path in enumerate(wal_paths):
+            with wal_path.open("rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of the log, the record was never acknowledged
+                        if i == len(wal_paths) - 1:
+                            break
+                        raise
+                    # Older records are already part of the snapshot
+                    if record["seq"] > version:
+                        records[UUID(record["uuid"])] = record
+                        last_seq = max(last_seq, record["seq"])
+
+        connectors, sources = [], []
+        for connector_uuid, record in records.items():
+            if record["connector"] is None:
+                continue
+            connectors.append(Connector.model_validate(record["connector"]))
+            sources.extend(
+                ConnectorSource.model_validate({**source, "connector_uuid": connector_uuid})
+                for source in record["sources"]
+            )
+        self.store.load(connectors, sources, version=last_seq)
+        return True
+
+    def start(self):
+        """
+        Write an initial snapshot, and start logging the mutations of the store.
+        """
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint()
+        self.store.subscribe(self.append)
+        self._running = True
+        self._thread = Thread(target=self._run, name="wal-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Flush the pending records and write a final snapshot.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.checkpoint()
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+
+    ##
+    ##? Write-ahead log
+    ##
+
+    def append(self, connector_uuid: UUID | None, structural: bool = False):
+        """
+        Buffer the new state of a connector that changed.
+
+        Store change listener: when everything changed, a snapshot is written instead.
+        """
+        if connector_uuid is None:
+            with self._cond:
+                self._checkpoint_requested = True
+                self._cond.notify()
+            return
+
+        connector = self.store.get_connector(connector_uuid)
+        record = {
+            "seq": self.store.version,
+            "uuid": str(connector_uuid),
+            "connector": connector.model_dump(mode="json") if connector is not None else None,
+            "sources": [
+                source.model_dump(mode="json") for source in self.store.list_sources(connector_uuid)
+            ],
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._cond:
+            self._buffer.append(line)
+            self._records_since_snapshot += 1
+            if self._records_since_snapshot >= self.snapshot_interval:
+                self._checkpoint_requested = True
+                self._cond.notify()
+
+    def flush(self):
+        """
+        Write and fsync the buffered records.
+        """
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            if self._wal_file is None:
+                self._open_wal()
+            self._wal_file.write("".join(lines).encode())
+            self._wal_file.flush()
+            os.fsync(self._wal_file.fileno())
+
+    def checkpoint(self):
+        """
+        Rotate the log, write a snapshot of the store, and remove the older log files.
+
+        Records logged after the rotation are replayed on top of the snapshot, which may
+        already include some of them: replaying them again is harmless.
+        """
+        with self._io_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+                self._checkpoint_requested = False
+                self._records_since_snapshot = 0
+            if self._wal_file is not None:
+                self._wal_file.write("".join(lines).encode())
+                self._wal_file.flush()
+                os.fsync(self._wal_file.fileno())
+                self._wal_file.close()
+            self._open_wal()
+            # Buffered records up to this version are part of the snapshot, which is
+            # read after it, more recent ones will be written to the new log file
+            version = self.store.version
+            obsolete_wal_paths = self._wal_paths()[:-1]
+
+        snapshot = {
+            "version": version,
+            "connectors": [
+                {
+                    "uuid": str(connector.uuid),
+                    "connector": connector.model_dump(mode="json"),
+                    "sources": [
+                        source.model_dump(mode="json")
+                        for source in self.store.list_sources(connector.uuid)
+                    ],
+                }
+                for connector in self.store.list_connectors()
+            ],
+        }
+        snapshot_path = self.data_dir / SNAPSHOT_FILE_NAME
+        tmp_path = snapshot_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(json.dumps(snapshot, separators=(",", ":")).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(snapshot_path)
+        self._fsync_dir()
+
+        for wal_path in obsolete_wal_paths:
+            wal_path.unlink()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and not self._checkpoint_requested:
+                    self._cond.wait(self.sync_interval)
+                running, checkpoint_requested = self._running, self._checkpoint_requested
+            if not running:
+                return
+            if checkpoint_requested:
+                self.checkpoint()
+            else:
+                self.flush()
+
+    def _open_wal(self):
+        wal_paths = self._wal_paths()
+        last_index = int(wal_paths[-1].stem.removeprefix(WAL_FILE_PREFIX)) if wal_paths else 0
+        wal_path = self.data_dir / f"{WAL_FILE_PREFIX}{last_index + 1:08d}{WAL_FILE_SUFFIX}"
+        self._wal_file = wal_path.open("ab")
+        self._fsync_dir()
+
+    def _wal_paths(self) -> list[Path]:
+        return sorted(self.data_dir.glob(f"{WAL_FILE_PREFIX}*{WAL_FILE_SUFFIX}"))
+
+    def _fsync_dir(self):
+        # Make file creations and renames durable
+        fd = os.open(self.data_dir, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
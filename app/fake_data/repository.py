@@ -0,0 +1,305 @@
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Any, Protocol
+from uuid import UUID
+
+from fake_data.shared import SharedRegistry
+from fake_data.store import ChangeListener, ConnectorStore, StoreSnapshot
+from models.connectors import Connector
+from models.connectors_and_sources import (
+    ConnectorAndSources,
+    ConnectorsFilter,
+    ConnectorSource,
+    TypeEnum,
+)
+from utils.fast_json import RenderedConnector
+
+
+class RegistrySnapshot(Protocol):
+    """
+    Reads of the registry at a fixed version, whatever is written meanwhile.
+
+    The version and modification time are the collection ones, as of the snapshot. Versions
+    are only unique within the epoch of the store.
+    """
+
+    epoch: str
+    version: int
+    last_modified: float
+
+    async def get_source(
+        self, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None: ...
+
+    async def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        """
+        Return the version of the source of a connector, None if it does not exist.
+        """
+
+    async def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None: ...
+
+    async def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]: ...
+
+    async def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]: ...
+
+    async def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None: ...
+
+
+class ConnectorRepository(Protocol):
+    """
+    Access to the connectors and their sources, as used by the routers.
+
+    Methods are coroutines so that backends doing I/O can await their driver instead of
+    blocking the event loop, while in-memory backends answer without any threadpool hop.
+    Listeners registered with `subscribe` are called after every mutation, like the
+    ConnectorStore ones. With `rendered`, joined connectors are returned already serialized
+    by the fast JSON path, as RenderedConnector tuples, rather than as Pydantic models.
+    """
+
+    async def get_connector(self, connector_uuid: UUID) -> Connector | None: ...
+
+    async def list_connectors(self) -> list[Connector]: ...
+
+    async def get_source(
+        self, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None: ...
+
+    async def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]: ...
+
+    async def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None: ...
+
+    async def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]: ...
+
+    async def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]: ...
+
+    async def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        """
+        Return the version and modification time of a connector, None if it does not exist.
+        """
+
+    async def upsert_connector(self, connector: Connector) -> Connector: ...
+
+    async def delete_connector(
+        self, connector_uuid: UUID
+    ) -> tuple[Connector, list[ConnectorSource]]:
+        """
+        Delete a connector and all its sources, raises KeyError if it does not exist.
+        """
+
+    async def upsert_source(
+        self, source: ConnectorSource, if_version: int | None = None
+    ) -> ConnectorSource:
+        """
+        Create or replace a source, identified by its connector and type.
+
+        With `if_version`, the source is only replaced if that is still its version, and
+        VersionConflictError is raised otherwise. Raises KeyError if the connector does not exist.
+        """
+
+    async def upsert_sources(self, sources: Iterable[ConnectorSource]) -> list[ConnectorSource]:
+        """
+        Create or replace sources, identified by their connector and type.
+
+        Raises KeyError before applying anything if one of the connectors does not exist.
+        """
+
+    async def delete_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource:
+        """
+        Delete the source of a connector, raises KeyError if it does not exist.
+        """
+
+    def subscribe(self, listener: ChangeListener): ...
+
+    def snapshot(self) -> AbstractAsyncContextManager[RegistrySnapshot]:
+        """
+        Pin the registry at its latest version, for the reads of a request to agree.
+        """
+
+
+async def run_inline(function: Callable, *args) -> Any:
+    return function(*args)
+
+
+class RepositorySnapshot:
+    """
+    RegistrySnapshot over the snapshot of a store, whose blocking reads are run by `run`.
+    """
+
+    def __init__(self, snapshot: StoreSnapshot, run: Callable[..., Awaitable] = run_inline):
+        self.snapshot = snapshot
+        self.run = run
+        self.epoch = snapshot.epoch
+        self.version = snapshot.version
+        self.last_modified = snapshot.last_modified
+
+    async def get_source(
+        self, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None:
+        return await self.run(self.snapshot.get_source, connector_uuid, type)
+
+    async def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        return await self.run(self.snapshot.get_source_version, connector_uuid, type)
+
+    async def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        return await self.run(self.snapshot.get_connector_and_sources, connector_uuid, rendered)
+
+    async def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return await self.run(
+            self.snapshot.list_connectors_and_sources, offset, limit, filter, rendered
+        )
+
+    async def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return await self.run(
+            self.snapshot.list_connectors_and_sources_after, after, limit, filter, rendered
+        )
+
+    async def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        return await self.run(self.snapshot.get_version, connector_uuid)
+
+
+class InMemoryRepository:
+    """
+    ConnectorRepository over the in-memory ConnectorStore.
+
+    Every call completes synchronously, the coroutines never suspend. When the registry is
+    shared between workers, source writes go through the SharedRegistry so that every
+    worker applies them, and the writes it does not replicate, creating or deleting
+    connectors and deleting sources, raise a RuntimeError rather than only changing the
+    local store.
+    """
+
+    def __init__(self, store: ConnectorStore, shared: SharedRegistry | None = None):
+        self.store = store
+        self.shared = shared
+
+    async def get_connector(self, connector_uuid: UUID) -> Connector | None:
+        return self.store.get_connector(connector_uuid)
+
+    async def list_connectors(self) -> list[Connector]:
+        return self.store.list_connectors()
+
+    async def get_source(
+        self, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None:
+        return self.store.get_source(connector_uuid, type)
+
+    async def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]:
+        return self.store.list_sources(connector_uuid)
+
+    async def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        return self.store.get_connector_and_sources(connector_uuid, rendered=rendered)
+
+    async def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return self.store.list_connectors_and_sources(
+            offset=offset, limit=limit, filter=filter, rendered=rendered
+        )
+
+    async def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return self.store.list_connectors_and_sources_after(
+            after, limit=limit, filter=filter, rendered=rendered
+        )
+
+    async def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        return self.store.get_version(connector_uuid)
+
+    async def upsert_connector(self, connector: Connector) -> Connector:
+        self._check_not_shared("Connectors cannot be created")
+        return self.store.upsert_connector(connector)
+
+    async def delete_connector(
+        self, connector_uuid: UUID
+    ) -> tuple[Connector, list[ConnectorSource]]:
+        self._check_not_shared("Connectors cannot be deleted")
+        return self.store.delete_connector(connector_uuid)
+
+    async def upsert_source(
+        self, source: ConnectorSource, if_version: int | None = None
+    ) -> ConnectorSource:
+        if self.shared is not None:
+            self.shared.publish([source], if_version)
+        else:
+            self.store.upsert_source(source, if_version)
+        return source
+
+    async def upsert_sources(self, sources: Iterable[ConnectorSource]) -> list[ConnectorSource]:
+        sources = list(sources)
+        if self.shared is not None:
+            self.shared.publish(sources)
+        else:
+            self.store.upsert_sources(sources)
+        return sources
+
+    async def delete_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource:
+        self._check_not_shared("Sources cannot be deleted")
+        return self.store.delete_source(connector_uuid, type)
+
+    def subscribe(self, listener: ChangeListener):
+        self.store.subscribe(listener)
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[RepositorySnapshot]:
+        # Nothing to release, the state of the store is immutable
+        yield RepositorySnapshot(self.store.snapshot())
+
+    def _check_not_shared(self, message: str):
+        if self.shared is not None:
+            raise RuntimeError(
+                f"{message} while the registry is shared between workers, only the"
+                " availability of existing sources is replicated"
+            )
@@ -0,0 +1,214 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from collections.abc import Iterable
+from contextlib import contextmanager
+from pathlib import Path
+from threading import RLock
+from uuid import UUID
+
+from fake_data.store import SOURCE_TYPE_CODES, SOURCE_TYPES, ConnectorStore, check_version
+from models.connectors_and_sources import ConnectorSource, TypeEnum
+
+MAGIC = b"CONREG\x00\x03"
+# magic, layout fingerprint, log capacity, number of writes ever logged, store epoch
+HEADER = struct.Struct("<8s16sQQ8s")
+HEADER_SIZE = 64
+COUNT_OFFSET = 32
+# connector UUID, source type index, available
+ENTRY = struct.Struct("<16sBB6x")
+# Per source: (number of writes logged when it was last written) << 1 | available
+TABLE_ENTRY = struct.Struct("<Q")
+
+
+class SharedRegistry:
+    """
+    Replication of source availability writes between worker processes.
+
+    Workers share a memory-mapped file (ideally under /dev/shm) holding a ring log of the
+    writes, and a table with the current availability of every source, and the position of
+    its last write in the log. A write is appended
+    to the log under an exclusive file lock, and every worker, including the writer, then
+    applies the log entries to its own store, one by one and in log order. All the stores
+    thus go through the same mutations from the same seed, and end up with the same data
+    and the same versions. The epoch of the stores is the one of the worker that created the
+    file, so that ETags and change sequence numbers agree between workers.
+
+    A worker lagging more than the log capacity behind (e.g. started long after the others)
+    resyncs from the table instead. The seed load being version 1, and every log entry
+    bumping the version once, a source last written by the Nth entry is at version N + 1 in
+    every worker, so that the resynced worker restores the same source versions, and its
+    change feed starts over.
+
+    Only availability changes of existing sources are replicated: connectors and sources
+    cannot be created or deleted while the registry is shared, and all the workers must load
+    the same seed, which is checked when attaching.
+    """
+
+    def __init__(self, store: ConnectorStore, path: str | Path, capacity: int):
+        self.store = store
+        self.path = Path(path)
+        self.capacity = capacity
+        # Number of log entries applied to the local store
+        self._applied = 0
+        self._slots: dict[tuple[UUID, TypeEnum], int] = {}
+        self._layout: list[tuple[UUID, TypeEnum]] = []
+        self._fd: int | None = None
+        self._mmap: mmap.mmap | None = None
+        self._table_offset = HEADER_SIZE
+        self._log_offset = 0
+        # flock does not exclude the threads of a process
+        self._lock = RLock()
+
+    def attach(self):
+        """
+        Open or create the shared file, then catch up with the writes of the other workers.
+
+        Must be called once the seed is loaded in the store.
+        """
+        self._layout = sorted(
+            (
+                (source.connector_uuid, source.type)
+                for connector in self.store.list_connectors()
+                for source in self.store.list_sources(connector.uuid)
+            ),
+            key=lambda slot: (slot[0].int, SOURCE_TYPE_CODES[slot[1]]),
+        )
+        self._slots = {slot: i for i, slot in enumerate(self._layout)}
+        fingerprint = hashlib.blake2b(
+            b"".join(uuid.bytes + bytes([SOURCE_TYPE_CODES[type]]) for uuid, type in self._layout),
+            digest_size=16,
+        ).digest()
+
+        self._log_offset = HEADER_SIZE + len(self._layout) * TABLE_ENTRY.size
+        size = self._log_offset + self.capacity * ENTRY.size
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._file_lock(fcntl.LOCK_EX):
+            created = os.fstat(self._fd).st_size == 0
+            if created:
+                os.ftruncate(self._fd, size)
+            elif os.fstat(self._fd).st_size != size:
+                raise self._mismatch()
+            self._mmap = mmap.mmap(self._fd, size)
+
+            if created:
+                for i, (connector_uuid, type) in enumerate(self._layout):
+                    source = self.store.get_source(connector_uuid, type)
+                    self._set_table_entry(i, 0, source.available)
+                HEADER.pack_into(
+                    self._mmap, 0, MAGIC, fingerprint, self.capacity, 0, self.store.epoch.encode()
+                )
+            else:
+                header = HEADER.unpack_from(self._mmap, 0)
+                if header[:3] != (MAGIC, fingerprint, self.capacity):
+                    raise self._mismatch()
+                self.store.epoch = header[4].decode()
+            self._catch_up()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def sync(self):
+        """
+        Apply the writes of the other workers to the local store.
+
+        Cheap when nothing changed: the number of logged writes is read without any lock.
+        """
+        if self._count() == self._applied:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+
+    def publish(self, sources: Iterable[ConnectorSource], if_version: int | None = None):
+        """
+        Log the availability of the given sources for all the workers, then apply it locally.
+
+        With `if_version`, the single given source is only logged if that is still its
+        version, once the writes of the other workers are applied, and VersionConflictError
+        is raised otherwise: workers have the same versions, so the check holds for all.
+        Raises KeyError if one of the sources is not part of the shared layout.
+        """
+        slots = [(self._slots[(source.connector_uuid, source.type)], source) for source in sources]
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            if if_version is not None:
+                self._catch_up()
+                ((_, source),) = slots
+                current = self.store.get_source_version(source.connector_uuid, source.type)
+                check_version(source, if_version, current)
+            count = self._count()
+            for slot, source in slots:
+                ENTRY.pack_into(
+                    self._mmap,
+                    self._log_offset + count % self.capacity * ENTRY.size,
+                    source.connector_uuid.bytes,
+                    SOURCE_TYPE_CODES[source.type],
+                    source.available,
+                )
+                count += 1
+                self._set_table_entry(slot, count, source.available)
+            # Entries are written before the count, for the readers checking it without lock
+            struct.pack_into("<Q", self._mmap, COUNT_OFFSET, count)
+            self._catch_up()
+
+    def _catch_up(self):
+        count = self._count()
+        if count - self._applied > self.capacity:
+            self._resync(count)
+            return
+        for i in range(self._applied, count):
+            connector_uuid, type_index, available = ENTRY.unpack_from(
+                self._mmap, self._log_offset + i % self.capacity * ENTRY.size
+            )
+            source = self.store.get_source(UUID(bytes=connector_uuid), SOURCE_TYPES[type_index])
+            # Applied even when unchanged, so that every worker bumps the same versions
+            self.store.upsert_source(source.model_copy(update={"available": bool(available)}))
+            self._applied = i + 1
+
+    def _resync(self, count: int):
+        sources = []
+        source_versions = {}
+        for i, (connector_uuid, type) in enumerate(self._layout):
+            source = self.store.get_source(connector_uuid, type)
+            (entry,) = TABLE_ENTRY.unpack_from(
+                self._mmap, self._table_offset + i * TABLE_ENTRY.size
+            )
+            sources.append(source.model_copy(update={"available": bool(entry & 1)}))
+            source_versions[(connector_uuid, type)] = (entry >> 1) + 1
+        # The seed load is version 1, then every log entry bumps the version once
+        self.store.load(
+            self.store.list_connectors(),
+            sources,
+            version=count + 1,
+            source_versions=source_versions,
+        )
+        self._applied = count
+
+    def _set_table_entry(self, slot: int, count: int, available: bool):
+        TABLE_ENTRY.pack_into(
+            self._mmap, self._table_offset + slot * TABLE_ENTRY.size, count << 1 | available
+        )
+
+    def _mismatch(self) -> RuntimeError:
+        return RuntimeError(
+            f"The shared registry {self.path} was created by workers with another seed"
+            " or capacity, remove it to start over"
+        )
+
+    def _count(self) -> int:
+        return struct.unpack_from("<Q", self._mmap, COUNT_OFFSET)[0]
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        fcntl.flock(self._fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
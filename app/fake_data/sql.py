@@ -0,0 +1,781 @@
+"""
+SQLite backend for the registry.
+
+UUIDs are stored as 16-byte big-endian blobs, which sort like the UUIDs themselves, so
+that listings are ordered as with the in-memory store. The sources of a connector are
+listed in the order of the source types, and are unique per type and per UUID.
+
+Import the JSON fixtures into a database file with `python -m fake_data.sql <path>`.
+"""
+
+import sqlite3
+import sys
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from itertools import groupby
+from pathlib import Path
+from queue import Queue
+from secrets import token_hex
+from threading import Lock
+from time import time
+from typing import Any
+from uuid import UUID
+
+from anyio import CancelScope, Semaphore, to_thread
+from fake_data.repository import RepositorySnapshot
+from fake_data.store import (
+    EMPTY_SLOTS,
+    SOURCE_TYPES,
+    ChangeListener,
+    DuplicateSourceError,
+    check_version,
+    with_source,
+)
+from models.connectors import Connector
+from models.connectors_and_sources import (
+    ConnectorAndSources,
+    ConnectorsFilter,
+    ConnectorSource,
+    TypeEnum,
+)
+from utils.fast_json import RenderedConnector, render_connector, render_source
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS registry (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    last_modified REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS connectors (
+    uuid BLOB PRIMARY KEY,
+    version INTEGER NOT NULL,
+    last_modified REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    connector_uuid BLOB NOT NULL REFERENCES connectors (uuid) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    uuid BLOB NOT NULL,
+    available INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    UNIQUE (connector_uuid, type)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS sources_connector_uuid_uuid ON sources (connector_uuid, uuid);
+"""
+
+# Sources are listed in the order of the types, as with the in-memory store
+SOURCE_ORDER = "CASE type {} END".format(
+    " ".join(f"WHEN '{type.value}' THEN {code}" for code, type in enumerate(SOURCE_TYPES))
+)
+
+# Statements are constant strings, so that every connection prepares them once and reuses
+# them from its statement cache
+SELECT_CONNECTOR = "SELECT uuid FROM connectors WHERE uuid = ?"
+SELECT_CONNECTORS = "SELECT uuid FROM connectors ORDER BY uuid"
+SELECT_CONNECTOR_COUNT = "SELECT count(*) FROM connectors"
+SELECT_SOURCE = (
+    "SELECT connector_uuid, uuid, type, available FROM sources"
+    " WHERE connector_uuid = ? AND type = ?"
+)
+SELECT_SOURCE_VERSION = "SELECT version FROM sources WHERE connector_uuid = ? AND type = ?"
+SELECT_SOURCES = (
+    "SELECT connector_uuid, uuid, type, available FROM sources"
+    f" WHERE connector_uuid = ? ORDER BY {SOURCE_ORDER}"
+)
+# The page of connectors is selected first, then joined with its sources in the same query
+SELECT_CONNECTORS_AND_SOURCES = f"""
+SELECT c.uuid, s.uuid, s.type, s.available
+FROM (SELECT uuid FROM connectors WHERE uuid > ?{{filter}} ORDER BY uuid LIMIT ? OFFSET ?) AS c
+LEFT JOIN sources AS s ON s.connector_uuid = c.uuid
+ORDER BY c.uuid, {SOURCE_ORDER.replace("type", "s.type")}
+"""
+# Conditions on the sources of the connectors, for filtered listings
+HAS_SOURCE = "SELECT 1 FROM sources WHERE connector_uuid = connectors.uuid"
+SELECT_CONNECTOR_AND_SOURCES = f"""
+SELECT c.uuid, s.uuid, s.type, s.available
+FROM connectors AS c
+LEFT JOIN sources AS s ON s.connector_uuid = c.uuid
+WHERE c.uuid = ?
+ORDER BY {SOURCE_ORDER.replace("type", "s.type")}
+"""
+SELECT_VERSION = "SELECT version, last_modified FROM connectors WHERE uuid = ?"
+INSERT_REGISTRY = "INSERT OR IGNORE INTO registry VALUES (1, 0, ?)"
+SELECT_REGISTRY_VERSION = "SELECT version, last_modified FROM registry"
+UPDATE_REGISTRY_VERSION = "UPDATE registry SET version = ?, last_modified = ?"
+UPSERT_CONNECTOR = """
+INSERT INTO connectors (uuid, version, last_modified) VALUES (?, ?, ?)
+ON CONFLICT (uuid) DO UPDATE SET version = excluded.version, last_modified = excluded.last_modified
+"""
+UPDATE_CONNECTOR_VERSION = "UPDATE connectors SET version = ?, last_modified = ? WHERE uuid = ?"
+UPDATE_CONNECTOR_VERSIONS = "UPDATE connectors SET version = ?, last_modified = ?"
+DELETE_CONNECTOR = "DELETE FROM connectors WHERE uuid = ?"
+DELETE_CONNECTORS = "DELETE FROM connectors"
+UPSERT_SOURCE = """
+INSERT INTO sources (connector_uuid, type, uuid, available, version) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (connector_uuid, type) DO UPDATE
+SET uuid = excluded.uuid, available = excluded.available, version = excluded.version
+"""
+UPDATE_SOURCE_VERSIONS = "UPDATE sources SET version = ?"
+ADD_SOURCE_VERSION = "ALTER TABLE sources ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+UPDATE_SOURCE_VERSIONS_TO_REGISTRY = "UPDATE sources SET version = (SELECT version FROM registry)"
+DELETE_SOURCE = "DELETE FROM sources WHERE connector_uuid = ? AND type = ?"
+
+# SQLite LIMIT value meaning no limit
+NO_LIMIT = -1
+
+
+class SQLiteStore:
+    """
+    Repository for connectors and their sources, stored in a SQLite database.
+
+    It has the same interface and versioning as the in-memory ConnectorStore, with
+    the versions persisted along with the data. The epoch is still drawn on every start,
+    as the database may have been replaced or rolled back meanwhile. Calls block on the
+    database: they are thread-safe, each one borrowing a connection from a pool, so that
+    reads run concurrently (SQLite WAL mode). Writes are serialized, and listeners are
+    notified after the commit, on the calling thread.
+
+    An in-memory database (":memory:") is private to a connection, so it is served by
+    a single one.
+    """
+
+    def __init__(self, path: str | Path, pool_size: int):
+        self.path = str(path)
+        if self.path == ":memory:":
+            pool_size = 1
+        self.pool_size = pool_size
+        self.epoch = token_hex(4)
+        self._pool: Queue[sqlite3.Connection] = Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        self._listeners: list[ChangeListener] = []
+        # SQLite has a single writer anyway, waiting here keeps the version bumps in commit order
+        self._write_lock = Lock()
+        # Read counters, exposed as metrics like the ConnectorStore ones: lookups by primary key
+        # (found or not), reads of a range of the primary key, and filtered reads, which scan
+        # the connectors. They are not locked, concurrent reads may miss an increment.
+        self.lookup_hits = 0
+        self.lookup_misses = 0
+        self.range_reads = 0
+        self.scans = 0
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+            connection.execute(INSERT_REGISTRY, (time(),))
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(sources)")}
+            if "version" not in columns:
+                # Database created before sources were versioned, they start at its version
+                connection.execute(ADD_SOURCE_VERSION)
+                connection.execute(UPDATE_SOURCE_VERSIONS_TO_REGISTRY)
+            # Version of the last notified mutation
+            self.version, self.last_modified = connection.execute(
+                SELECT_REGISTRY_VERSION
+            ).fetchone()
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return connection.execute(SELECT_CONNECTOR_COUNT).fetchone()[0]
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    ##
+    ##? Connectors
+    ##
+
+    def get_connector(self, connector_uuid: UUID) -> Connector | None:
+        with self._connection() as connection:
+            row = connection.execute(SELECT_CONNECTOR, (connector_uuid.bytes,)).fetchone()
+        self._count_lookup(row is not None)
+        return Connector(uuid=UUID(bytes=row[0])) if row is not None else None
+
+    def list_connectors(self) -> list[Connector]:
+        with self._connection() as connection:
+            rows = connection.execute(SELECT_CONNECTORS).fetchall()
+        return [Connector(uuid=UUID(bytes=connector_uuid)) for (connector_uuid,) in rows]
+
+    def upsert_connector(self, connector: Connector) -> Connector:
+        with self._write() as (connection, changes):
+            created = (
+                connection.execute(SELECT_CONNECTOR, (connector.uuid.bytes,)).fetchone() is None
+            )
+            connection.execute(UPSERT_CONNECTOR, (connector.uuid.bytes, 0, 0.0))
+            self._bump(connection, changes, connector.uuid, created)
+        return connector
+
+    def delete_connector(self, connector_uuid: UUID) -> tuple[Connector, list[ConnectorSource]]:
+        """
+        Delete a connector and all its sources.
+
+        Returns the deleted connector and its sources, raises KeyError if the connector does not
+        exist.
+        """
+        with self._write() as (connection, changes):
+            if connection.execute(SELECT_CONNECTOR, (connector_uuid.bytes,)).fetchone() is None:
+                raise KeyError(connector_uuid)
+            sources = self._list_sources(connection, connector_uuid)
+            connection.execute(DELETE_CONNECTOR, (connector_uuid.bytes,))
+            self._bump(connection, changes, connector_uuid, True)
+        return Connector(uuid=connector_uuid), sources
+
+    ##
+    ##? Sources
+    ##
+
+    def get_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource | None:
+        with self._connection() as connection:
+            return self._get_source(connection, connector_uuid, type)
+
+    def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]:
+        with self._connection() as connection:
+            return self._list_sources(connection, connector_uuid)
+
+    def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        with self._connection() as connection:
+            return self._get_source_version(connection, connector_uuid, type)
+
+    def upsert_source(
+        self, source: ConnectorSource, if_version: int | None = None
+    ) -> ConnectorSource:
+        """
+        Create or replace the source of a connector, identified by its type.
+
+        With `if_version`, the source is only replaced if that is still its version, and
+        VersionConflictError is raised otherwise. Raises KeyError if the connector does not exist.
+        """
+        with self._write() as (connection, changes):
+            if if_version is not None:
+                current = self._get_source_version(connection, source.connector_uuid, source.type)
+                check_version(source, if_version, current)
+            self._upsert_sources(connection, changes, [source])
+        return source
+
+    def upsert_sources(self, sources: Iterable[ConnectorSource]) -> list[ConnectorSource]:
+        """
+        Create or replace many sources at once, identified by their connector and type.
+
+        Listeners are notified once per connector that changed, rather than once per source.
+        Raises KeyError before applying anything if one of the connectors does not exist, and
+        DuplicateSourceError if a source would share its UUID with another source of its connector.
+        """
+        sources = list(sources)
+        with self._write() as (connection, changes):
+            self._upsert_sources(connection, changes, sources)
+        return sources
+
+    def _upsert_sources(
+        self, connection: sqlite3.Connection, changes: list, sources: list[ConnectorSource]
+    ):
+        sources_by_connector: dict[UUID, list[ConnectorSource]] = {}
+        for source in sources:
+            sources_by_connector.setdefault(source.connector_uuid, []).append(source)
+        for connector_uuid in sources_by_connector:
+            if connection.execute(SELECT_CONNECTOR, (connector_uuid.bytes,)).fetchone() is None:
+                raise KeyError(connector_uuid)
+        # The sources of each connector get the version of its change
+        try:
+            for connector_uuid, connector_sources in sources_by_connector.items():
+                version = self._bump(connection, changes, connector_uuid, False)
+                connection.executemany(
+                    UPSERT_SOURCE, (source_row(source, version) for source in connector_sources)
+                )
+        except sqlite3.IntegrityError as error:
+            raise DuplicateSourceError(
+                "A source UUID is already used by another source of its connector"
+            ) from error
+
+    def delete_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource:
+        """
+        Delete the source of a connector, identified by its type.
+
+        Raises KeyError if the connector or the source does not exist.
+        """
+        source = self.get_source(connector_uuid, type)
+        if source is None:
+            raise KeyError((connector_uuid, type))
+        with self._write() as (connection, changes):
+            connection.execute(DELETE_SOURCE, (connector_uuid.bytes, source.type.value))
+            self._bump(connection, changes, connector_uuid, False)
+        return source
+
+    ##
+    ##? Connectors and sources join
+    ##
+
+    # With `rendered`, connectors are rendered as JSON by the fast path rather than as models
+
+    def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        with self._connection() as connection:
+            return self._get_connector_and_sources(connection, connector_uuid, rendered)
+
+    def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        """
+        List the joined connectors ordered by UUID, starting at the given position.
+        """
+        with self._connection() as connection:
+            return self._list_connectors_and_sources(
+                connection, b"", offset, limit, filter, rendered
+            )
+
+    def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        """
+        List the joined connectors ordered by UUID, starting right after the given UUID.
+
+        This is a seek on the primary key, which stays stable under concurrent writes
+        unlike offset pagination.
+        """
+        after = b"" if after is None else after.bytes
+        with self._connection() as connection:
+            return self._list_connectors_and_sources(connection, after, 0, limit, filter, rendered)
+
+    def _get_connector_and_sources(
+        self, connection: sqlite3.Connection, connector_uuid: UUID, rendered: bool
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        rows = connection.execute(SELECT_CONNECTOR_AND_SOURCES, (connector_uuid.bytes,))
+        connectors = to_connectors_and_sources(rows, rendered)
+        self._count_lookup(bool(connectors))
+        return connectors[0] if connectors else None
+
+    def _list_connectors_and_sources(
+        self,
+        connection: sqlite3.Connection,
+        after: bytes,
+        offset: int,
+        limit: int | None,
+        filter: ConnectorsFilter | None,
+        rendered: bool,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        conditions, filter_parameters = filter_conditions(filter)
+        # There are a few variants of the statement at most, each one is prepared once
+        statement = SELECT_CONNECTORS_AND_SOURCES.format(filter=conditions)
+        # Any UUID is greater than the empty blob
+        parameters = (after, *filter_parameters, NO_LIMIT if limit is None else limit, offset)
+        if conditions:
+            self.scans += 1
+        else:
+            self.range_reads += 1
+        return to_connectors_and_sources(connection.execute(statement, parameters), rendered)
+
+    ##
+    ##? Change listeners
+    ##
+
+    def subscribe(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        """
+        Return the version and modification time of a connector, None if it does not exist.
+        """
+        with self._connection() as connection:
+            return self._get_version(connection, connector_uuid)
+
+    @contextmanager
+    def snapshot(self) -> Iterator["SQLiteSnapshot"]:
+        """
+        Pin the database at its latest committed version for a series of reads.
+
+        The snapshot holds a pooled connection, in a read transaction, until it is closed:
+        other calls wait for one of the remaining connections meanwhile.
+        """
+        with self._connection() as connection:
+            connection.execute("BEGIN")
+            try:
+                yield SQLiteSnapshot(self, connection)
+            finally:
+                connection.execute("COMMIT")
+
+    def _get_source(
+        self, connection: sqlite3.Connection, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None:
+        try:
+            type = TypeEnum(type)
+        except ValueError:
+            return None
+        row = connection.execute(SELECT_SOURCE, (connector_uuid.bytes, type.value)).fetchone()
+        self._count_lookup(row is not None)
+        return to_source(row) if row is not None else None
+
+    def _get_source_version(
+        self, connection: sqlite3.Connection, connector_uuid: UUID, type: TypeEnum | str
+    ) -> int | None:
+        try:
+            type = TypeEnum(type)
+        except ValueError:
+            return None
+        row = connection.execute(
+            SELECT_SOURCE_VERSION, (connector_uuid.bytes, type.value)
+        ).fetchone()
+        self._count_lookup(row is not None)
+        return row[0] if row is not None else None
+
+    def _get_version(
+        self, connection: sqlite3.Connection, connector_uuid: UUID
+    ) -> tuple[int, float] | None:
+        version = connection.execute(SELECT_VERSION, (connector_uuid.bytes,)).fetchone()
+        self._count_lookup(version is not None)
+        return version
+
+    def load(
+        self,
+        connectors: Iterable[Connector],
+        sources: Iterable[ConnectorSource],
+        version: int | None = None,
+    ):
+        """
+        Replace the whole content of the database in one transaction.
+
+        Sources of unknown connectors are skipped. Listeners are notified once.
+        Raises DuplicateSourceError, leaving the database untouched, if a connector has two
+        sources of the same type or with the same UUID.
+        """
+        connectors = list(connectors)
+        connector_uuids = {connector.uuid for connector in connectors}
+        sources = [source for source in sources if source.connector_uuid in connector_uuids]
+        slots = {}
+        for source in sources:
+            slots[source.connector_uuid] = with_source(
+                slots.get(source.connector_uuid, EMPTY_SLOTS), source, replace=False
+            )
+        with self._write() as (connection, changes):
+            connection.execute(DELETE_CONNECTORS)
+            if version is not None:
+                self.version = max(self.version, version - 1)
+            # Versions are set for all the connectors at once below
+            connection.executemany(
+                UPSERT_CONNECTOR, ((connector.uuid.bytes, 0, 0.0) for connector in connectors)
+            )
+            connection.executemany(UPSERT_SOURCE, map(source_row, sources))
+            self._bump(connection, changes, None, True)
+
+    ##
+    ##? Connections and transactions
+    ##
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly
+        connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, cached_statements=64
+        )
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA busy_timeout = 5000")
+        if self.path != ":memory:":
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    @contextmanager
+    def _write(self) -> Iterator[tuple[sqlite3.Connection, list]]:
+        """
+        Run a write transaction, then notify the listeners of the changes it recorded.
+        """
+        changes: list[tuple[UUID | None, bool, int, float]] = []
+        with self._write_lock:
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    yield connection, changes
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                if changes:
+                    connection.execute(UPDATE_REGISTRY_VERSION, changes[-1][2:])
+                connection.execute("COMMIT")
+            # Listeners see the version of each change in turn, as with the in-memory store
+            for connector_uuid, structural, self.version, self.last_modified in changes:
+                for listener in self._listeners:
+                    listener(connector_uuid, structural)
+
+    def _bump(
+        self,
+        connection: sqlite3.Connection,
+        changes: list,
+        connector_uuid: UUID | None,
+        structural: bool,
+    ) -> int:
+        """
+        Record a change of a connector, or of all of them, and return its version.
+        """
+        version = (changes[-1][2] if changes else self.version) + 1
+        last_modified = time()
+        if connector_uuid is None:
+            connection.execute(UPDATE_CONNECTOR_VERSIONS, (version, last_modified))
+            connection.execute(UPDATE_SOURCE_VERSIONS, (version,))
+        else:
+            connection.execute(
+                UPDATE_CONNECTOR_VERSION, (version, last_modified, connector_uuid.bytes)
+            )
+        changes.append((connector_uuid, structural, version, last_modified))
+        return version
+
+    def _count_lookup(self, found: bool):
+        if found:
+            self.lookup_hits += 1
+        else:
+            self.lookup_misses += 1
+
+    @staticmethod
+    def _list_sources(
+        connection: sqlite3.Connection, connector_uuid: UUID
+    ) -> list[ConnectorSource]:
+        return [
+            to_source(row) for row in connection.execute(SELECT_SOURCES, (connector_uuid.bytes,))
+        ]
+
+
+class SQLiteSnapshot:
+    """
+    Reads of a SQLiteStore within a read transaction.
+
+    In WAL mode, the transaction sees the database as of its first statement, which reads
+    the registry version, whatever is committed meanwhile. Created by `SQLiteStore.snapshot`.
+    """
+
+    def __init__(self, store: SQLiteStore, connection: sqlite3.Connection):
+        self._store = store
+        self._connection = connection
+        self.epoch = store.epoch
+        self.version, self.last_modified = connection.execute(SELECT_REGISTRY_VERSION).fetchone()
+
+    def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        return self._store._get_version(self._connection, connector_uuid)
+
+    def get_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource | None:
+        return self._store._get_source(self._connection, connector_uuid, type)
+
+    def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        return self._store._get_source_version(self._connection, connector_uuid, type)
+
+    def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        return self._store._get_connector_and_sources(self._connection, connector_uuid, rendered)
+
+    def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return self._store._list_connectors_and_sources(
+            self._connection, b"", offset, limit, filter, rendered
+        )
+
+    def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        after = b"" if after is None else after.bytes
+        return self._store._list_connectors_and_sources(
+            self._connection, after, 0, limit, filter, rendered
+        )
+
+
+class SQLiteRepository:
+    """
+    ConnectorRepository over a SQLiteStore, running the blocking calls in worker threads.
+
+    Calls wait for a pooled connection before taking a worker thread: snapshots keep their
+    connection across awaits, and need worker threads to read from it, so threads blocked
+    on the pool would starve the very snapshots that are to release it.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+        # One permit per pooled connection, held for as long as the call uses it
+        self._connections = Semaphore(store.pool_size)
+
+    async def get_connector(self, connector_uuid: UUID) -> Connector | None:
+        return await self._run(self.store.get_connector, connector_uuid)
+
+    async def list_connectors(self) -> list[Connector]:
+        return await self._run(self.store.list_connectors)
+
+    async def get_source(
+        self, connector_uuid: UUID, type: TypeEnum | str
+    ) -> ConnectorSource | None:
+        return await self._run(self.store.get_source, connector_uuid, type)
+
+    async def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]:
+        return await self._run(self.store.list_sources, connector_uuid)
+
+    async def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        return await self._run(self.store.get_connector_and_sources, connector_uuid, rendered)
+
+    async def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return await self._run(
+            self.store.list_connectors_and_sources, offset, limit, filter, rendered
+        )
+
+    async def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return await self._run(
+            self.store.list_connectors_and_sources_after, after, limit, filter, rendered
+        )
+
+    async def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        return await self._run(self.store.get_version, connector_uuid)
+
+    async def upsert_connector(self, connector: Connector) -> Connector:
+        return await self._run(self.store.upsert_connector, connector)
+
+    async def delete_connector(
+        self, connector_uuid: UUID
+    ) -> tuple[Connector, list[ConnectorSource]]:
+        return await self._run(self.store.delete_connector, connector_uuid)
+
+    async def upsert_source(
+        self, source: ConnectorSource, if_version: int | None = None
+    ) -> ConnectorSource:
+        return await self._run(self.store.upsert_source, source, if_version)
+
+    async def upsert_sources(self, sources: Iterable[ConnectorSource]) -> list[ConnectorSource]:
+        return await self._run(self.store.upsert_sources, list(sources))
+
+    async def delete_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource:
+        return await self._run(self.store.delete_source, connector_uuid, type)
+
+    def subscribe(self, listener: ChangeListener):
+        self.store.subscribe(listener)
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[RepositorySnapshot]:
+        async with self._connections:
+            context = self.store.snapshot()
+            # Shielded, so that a cancelled request, e.g. a stream whose client left, still
+            # gets its connection back to the pool
+            with CancelScope(shield=True):
+                snapshot = await to_thread.run_sync(context.__enter__)
+            try:
+                # Reads use the connection of the snapshot
+                yield RepositorySnapshot(snapshot, to_thread.run_sync)
+            finally:
+                with CancelScope(shield=True):
+                    await to_thread.run_sync(context.__exit__, None, None, None)
+
+    async def _run(self, function: Callable, *args) -> Any:
+        async with self._connections:
+            return await to_thread.run_sync(function, *args)
+
+
+def source_row(source: ConnectorSource, version: int = 0) -> tuple[bytes, str, bytes, bool, int]:
+    return (
+        source.connector_uuid.bytes,
+        source.type.value,
+        source.uuid.bytes,
+        source.available,
+        version,
+    )
+
+
+def to_source(row: tuple[bytes, bytes, str, int]) -> ConnectorSource:
+    connector_uuid, uuid, type, available = row
+    return ConnectorSource(
+        connector_uuid=UUID(bytes=connector_uuid),
+        uuid=UUID(bytes=uuid),
+        type=type,
+        available=available,
+    )
+
+
+def filter_conditions(filter: ConnectorsFilter | None) -> tuple[str, tuple]:
+    """
+    Translate a filter into SQL conditions on the connectors table, and their parameters.
+    """
+    if filter is None:
+        return "", ()
+    conditions, parameters = [], []
+    if filter.type is not None or filter.available is not None:
+        condition = HAS_SOURCE
+        if filter.type is not None:
+            condition += " AND type = ?"
+            parameters.append(filter.type.value)
+        if filter.available is not None:
+            condition += " AND available = ?"
+            parameters.append(filter.available)
+        conditions.append(f"EXISTS ({condition})")
+    if filter.has_available_source is not None:
+        exists = "EXISTS" if filter.has_available_source else "NOT EXISTS"
+        conditions.append(f"{exists} ({HAS_SOURCE} AND available = 1)")
+    return "".join(f" AND {condition}" for condition in conditions), tuple(parameters)
+
+
+def to_connectors_and_sources(
+    rows: Iterable[tuple], rendered: bool = False
+) -> list[ConnectorAndSources] | list[RenderedConnector]:
+    """
+    Group the rows of a connectors LEFT JOIN sources query, ordered by connector.
+    """
+    if rendered:
+        return [
+            render_connector(
+                int.from_bytes(connector_uuid),
+                [
+                    render_source(int.from_bytes(uuid), type, available)
+                    for _, uuid, type, available in connector_rows
+                    if uuid is not None
+                ],
+            )
+            for connector_uuid, connector_rows in groupby(rows, key=lambda row: row[0])
+        ]
+    connectors = []
+    for connector_uuid, connector_rows in groupby(rows, key=lambda row: row[0]):
+        connector_uuid_bytes = connector_uuid
+        connector_uuid = UUID(bytes=connector_uuid_bytes)
+        sources = [
+            to_source((connector_uuid_bytes, *row[1:]))
+            for row in connector_rows
+            # A connector without sources is joined with a single NULL row
+            if row[1] is not None
+        ]
+        connectors.append(ConnectorAndSources(uuid=connector_uuid, sources=sources))
+    return connectors
+
+
+if __name__ == "__main__":
+    from fake_data.loader import SEED_DIR, load_models
+
+    store = SQLiteStore(sys.argv[1], pool_size=1)
+    connectors, _, _ = load_models(SEED_DIR / "connectors.json", Connector)
+    sources, _, _ = load_models(SEED_DIR / "sources.json", ConnectorSource)
+    store.load(connectors, sources)
+    print(f"Imported {len(store)} connectors into {sys.argv[1]}")
+    store.close()
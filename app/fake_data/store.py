@@ -0,0 +1,705 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Mapping
+from itertools import islice
+from secrets import token_hex
+from threading import RLock
+from time import time
+from typing import NamedTuple
+from uuid import UUID
+
+from models.connectors import Connector
+from models.connectors_and_sources import (
+    ConnectorAndSources,
+    ConnectorsFilter,
+    ConnectorSource,
+    TypeEnum,
+)
+from utils.bitset import delete_bit, from_positions, insert_bit, iter_set_bits, set_bit
+from utils.fast_json import RenderedConnector, render_connector, render_source
+from utils.persistent_map import PersistentMap
+
+# Called after each mutation with the UUID of the connector that changed (None when
+# everything changed), and whether connectors were added or removed
+ChangeListener = Callable[[UUID | None, bool], None]
+
+# Source types are stored as their index in this tuple, which is also the order in
+# which the sources of a connector are listed
+SOURCE_TYPES = tuple(TypeEnum)
+SOURCE_TYPE_CODES = {type: code for code, type in enumerate(SOURCE_TYPES)}
+SOURCE_TYPE_VALUES = tuple(type.value for type in SOURCE_TYPES)
+
+
+class DuplicateSourceError(ValueError):
+    """
+    Raised when a connector would get two sources of the same type, or with the same UUID.
+    """
+
+
+class VersionConflictError(ValueError):
+    """
+    Raised when a conditional write finds the source at another version than expected.
+    """
+
+    def __init__(self, message: str, version: int | None):
+        super().__init__(message)
+        # Current version of the source, None if it does not exist
+        self.version = version
+
+
+class SourceRecord:
+    """
+    Compact storage of a source: its UUID as an int, its availability, and its version.
+
+    The connector UUID and the source type are the key and slot the record is stored in.
+    The version is the one of the mutation that last wrote the source, 0 for the sources
+    written by the last load, which have the version of the load.
+    """
+
+    __slots__ = ("uuid", "available", "version")
+
+    def __init__(self, uuid: int, available: bool, version: int = 0):
+        self.uuid = uuid
+        self.available = available
+        self.version = version
+
+
+# Slots of a connector, by source type code
+Slots = tuple[SourceRecord | None, ...]
+EMPTY_SLOTS: Slots = (None,) * len(SOURCE_TYPES)
+# Bitsets of an empty store, one per source type code
+EMPTY_BITSETS = (0,) * len(SOURCE_TYPES)
+
+
+class RegistryState(NamedTuple):
+    """
+    Content of a ConnectorStore at a given version, never modified once published.
+    """
+
+    # connector UUID -> source slots, the keys are the connectors, as they have no field
+    # but their UUID
+    sources: PersistentMap[Slots]
+    # Connector UUIDs, sorted
+    order: list[int]
+    # Per source type code, bit i set if the connector at order[i] has a source of that
+    # type, and if it is available
+    has: tuple[int, ...]
+    available: tuple[int, ...]
+    # Version and modification time of the connectors changed since the last load, the
+    # others have the version of the load
+    versions: PersistentMap[tuple[int, float]]
+    loaded: tuple[int, float]
+    # Collection version and modification time
+    version: int
+    last_modified: float
+
+
+class ConnectorStore:
+    """
+    In-memory repository for connectors and their sources.
+
+    Connectors are keyed by the int value of their UUID, and map to a fixed tuple of
+    source slots, one per type, so that every lookup done by the routers is O(1) and a
+    connector cannot have two sources of the same type. Sources are kept as slotted
+    SourceRecord instances, a fraction of the size of the Pydantic models, which are
+    only built when they are read.
+    All mutations must go through this class to keep the indexes consistent.
+
+    Connector UUIDs are also kept sorted for pagination, so reading a page of the
+    connector -> sources join only costs the size of the page. For each source type, two
+    bitsets over this sorted index tell which connectors have a source of that type, and
+    which have it available: listings filtered on sources are a few bitwise operations
+    over all the connectors, and the matches come out already sorted.
+
+    The whole content is an immutable RegistryState, which every mutation replaces.
+    Writers are serialized by a lock: they build the next state from the current one,
+    copying only what changes (a shard of the sources map, the bitsets), and publish it
+    with a single assignment. Readers take the current state once per call and never
+    lock, so they may run on any thread, and always see the store as it was between two
+    mutations. A series of reads can be served from the same version with `snapshot`.
+
+    Every mutation bumps the store `version`, and records it as the version of the
+    connector that changed, along with the modification time, and as the version of the
+    sources it wrote. Versions start over with every new store, e.g. when the process
+    restarts, so they only identify a state along with the `epoch` of the store, a random
+    token drawn when it is created: validators exposed to clients must carry both.
+    Listeners registered with `subscribe` are notified after every mutation, on the
+    writing thread, in version order.
+    """
+
+    def __init__(self):
+        now = time()
+        self.epoch = token_hex(4)
+        self._state = RegistryState(
+            PersistentMap(), [], EMPTY_BITSETS, EMPTY_BITSETS, PersistentMap(), (0, now), 0, now
+        )
+        # Reentrant, so that listeners may write in turn
+        self._write_lock = RLock()
+        self._listeners: list[ChangeListener] = []
+        # Read counters, exposed as metrics: lookups of a connector by UUID (found or not),
+        # reads of a range of the sorted index, and scans of the bitsets of all the connectors.
+        # They are not locked, concurrent reads may miss an increment.
+        self.lookup_hits = 0
+        self.lookup_misses = 0
+        self.range_reads = 0
+        self.scans = 0
+
+    def __len__(self) -> int:
+        return len(self._state.sources)
+
+    @property
+    def version(self) -> int:
+        return self._state.version
+
+    @property
+    def last_modified(self) -> float:
+        return self._state.last_modified
+
+    ##
+    ##? Connectors
+    ##
+
+    def get_connector(self, connector_uuid: UUID) -> Connector | None:
+        return self.snapshot().get_connector(connector_uuid)
+
+    def list_connectors(self) -> list[Connector]:
+        return self.snapshot().list_connectors()
+
+    def upsert_connector(self, connector: Connector) -> Connector:
+        with self._write_lock:
+            state = self._state
+            created = connector.uuid.int not in state.sources
+            if created:
+                position = bisect_left(state.order, connector.uuid.int)
+                order = state.order.copy()
+                order.insert(position, connector.uuid.int)
+                state = state._replace(
+                    sources=state.sources.set([(connector.uuid.int, EMPTY_SLOTS)]),
+                    order=order,
+                    has=tuple(insert_bit(bits, position) for bits in state.has),
+                    available=tuple(insert_bit(bits, position) for bits in state.available),
+                )
+            self._commit(state, [(connector.uuid, created)])
+        return connector
+
+    def delete_connector(self, connector_uuid: UUID) -> tuple[Connector, list[ConnectorSource]]:
+        """
+        Delete a connector and all its sources.
+
+        Returns the deleted connector and its sources, raises KeyError if the connector does not
+        exist.
+        """
+        with self._write_lock:
+            state = self._state
+            slots = state.sources[connector_uuid.int]
+            # O(N) copy, but deleting a connector is a rare administrative operation
+            position = bisect_left(state.order, connector_uuid.int)
+            order = state.order.copy()
+            del order[position]
+            state = state._replace(
+                sources=state.sources.delete([connector_uuid.int]),
+                order=order,
+                has=tuple(delete_bit(bits, position) for bits in state.has),
+                available=tuple(delete_bit(bits, position) for bits in state.available),
+            )
+            self._commit(state, [(connector_uuid, True)])
+        return Connector(uuid=connector_uuid), to_sources(connector_uuid, slots)
+
+    ##
+    ##? Sources
+    ##
+
+    def get_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource | None:
+        return self.snapshot().get_source(connector_uuid, type)
+
+    def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]:
+        return self.snapshot().list_sources(connector_uuid)
+
+    def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        return self.snapshot().get_source_version(connector_uuid, type)
+
+    def upsert_source(
+        self, source: ConnectorSource, if_version: int | None = None
+    ) -> ConnectorSource:
+        """
+        Create or replace the source of a connector, identified by its type.
+
+        With `if_version`, the source is only replaced if that is still its version, and
+        VersionConflictError is raised otherwise. Raises KeyError if the connector does not
+        exist, and DuplicateSourceError if another source of the connector has the same UUID.
+        """
+        with self._write_lock:
+            if if_version is not None:
+                current = self.snapshot().get_source_version(source.connector_uuid, source.type)
+                check_version(source, if_version, current)
+            self.upsert_sources([source])
+        return source
+
+    def upsert_sources(self, sources: Iterable[ConnectorSource]) -> list[ConnectorSource]:
+        """
+        Create or replace many sources at once, identified by their connector and type.
+
+        All the sources are published at once, and listeners are notified once per connector
+        that changed, rather than once per source. Raises KeyError or DuplicateSourceError
+        before applying anything if one of the connectors does not exist or one of the
+        sources conflicts with another.
+        """
+        sources = list(sources)
+        with self._write_lock:
+            state = self._state
+            updated_slots: dict[int, Slots] = {}
+            # The version _commit gives to the change of each connector, in order
+            versions: dict[int, int] = {}
+            for source in sources:
+                connector_uuid = source.connector_uuid.int
+                if connector_uuid not in state.sources:
+                    raise KeyError(source.connector_uuid)
+                slots = updated_slots.get(connector_uuid, state.sources[connector_uuid])
+                version = versions.setdefault(connector_uuid, state.version + len(versions) + 1)
+                updated_slots[connector_uuid] = with_source(slots, source, version=version)
+
+            state = reindexed(state, updated_slots)
+            changes = dict.fromkeys(source.connector_uuid for source in sources)
+            self._commit(state, [(connector_uuid, False) for connector_uuid in changes])
+        return sources
+
+    def delete_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource:
+        """
+        Delete the source of a connector, identified by its type.
+
+        Raises KeyError if the connector or the source does not exist.
+        """
+        with self._write_lock:
+            source = self.get_source(connector_uuid, type)
+            if source is None:
+                raise KeyError((connector_uuid, type))
+            state = self._state
+            slots = list(state.sources[connector_uuid.int])
+            slots[SOURCE_TYPE_CODES[source.type]] = None
+            state = reindexed(state, {connector_uuid.int: tuple(slots)})
+            self._commit(state, [(connector_uuid, False)])
+        return source
+
+    ##
+    ##? Connectors and sources join
+    ##
+
+    # With `rendered`, connectors are rendered as JSON by the fast path rather than as models
+
+    def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        return self.snapshot().get_connector_and_sources(connector_uuid, rendered)
+
+    def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return self.snapshot().list_connectors_and_sources(offset, limit, filter, rendered)
+
+    def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        return self.snapshot().list_connectors_and_sources_after(after, limit, filter, rendered)
+
+    ##
+    ##? Change listeners
+    ##
+
+    def subscribe(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        """
+        Return the version and modification time of a connector, None if it does not exist.
+        """
+        return self.snapshot().get_version(connector_uuid)
+
+    def snapshot(self) -> "StoreSnapshot":
+        """
+        Return the store as of its latest version, unaffected by later mutations.
+        """
+        return StoreSnapshot(self, self._state)
+
+    def _commit(self, state: RegistryState, changes: list[tuple[UUID | None, bool]]):
+        """
+        Publish the next state, then notify the listeners of each change in turn.
+
+        Each change gets its own version, published before its listeners are called, with
+        the versions of all the changed connectors updated at once. Must be called with
+        the write lock held.
+        """
+        version, last_modified = state.version, time()
+        updated, deleted = [], []
+        for connector_uuid, _ in changes:
+            version += 1
+            if connector_uuid is None:
+                # The versions of the state are the ones of the load
+                state = state._replace(loaded=(version, last_modified))
+                updated, deleted = [], []
+            elif connector_uuid.int in state.sources:
+                updated.append((connector_uuid.int, (version, last_modified)))
+            else:
+                deleted.append(connector_uuid.int)
+        if updated or deleted:
+            state = state._replace(versions=state.versions.set(updated).delete(deleted))
+
+        version = state.version
+        for connector_uuid, structural in changes:
+            version += 1
+            self._state = state._replace(version=version, last_modified=last_modified)
+            for listener in self._listeners:
+                listener(connector_uuid, structural)
+
+    def load(
+        self,
+        connectors: Iterable[Connector],
+        sources: Iterable[ConnectorSource],
+        version: int | None = None,
+        source_versions: Mapping[tuple[UUID, TypeEnum], int] | None = None,
+    ):
+        """
+        Replace the whole content of the store, building the indexes in one pass.
+
+        Sources of unknown connectors are skipped. Listeners are notified once. When
+        restoring a persisted store, `version` is the version it had, so that versions
+        are never reused. Sources otherwise get the version of the load, unless given
+        in `source_versions`, by connector UUID and type: their connectors then get the
+        latest version of their sources.
+
+        Raises DuplicateSourceError, leaving the store untouched, if a connector has two
+        sources of the same type or with the same UUID.
+        """
+        sources_by_connector = {connector.uuid.int: EMPTY_SLOTS for connector in connectors}
+        source_versions = source_versions or {}
+        connector_versions: dict[int, int] = {}
+        for source in sources:
+            slots = sources_by_connector.get(source.connector_uuid.int)
+            if slots is not None:
+                source_version = source_versions.get((source.connector_uuid, source.type), 0)
+                sources_by_connector[source.connector_uuid.int] = with_source(
+                    slots, source, replace=False, version=source_version
+                )
+                if source_version:
+                    connector_versions[source.connector_uuid.int] = max(
+                        source_version, connector_versions.get(source.connector_uuid.int, 0)
+                    )
+        order = sorted(sources_by_connector)
+        # The bitsets are built from scratch rather than bit by bit
+        has = [[] for _ in SOURCE_TYPES]
+        available = [[] for _ in SOURCE_TYPES]
+        for position, connector_uuid in enumerate(order):
+            for code, record in enumerate(sources_by_connector[connector_uuid]):
+                if record is not None:
+                    has[code].append(position)
+                    if record.available:
+                        available[code].append(position)
+
+        now = time()
+        with self._write_lock:
+            state = self._state
+            self._commit(
+                state._replace(
+                    sources=PersistentMap(sources_by_connector.items()),
+                    versions=PersistentMap(
+                        (connector_uuid, (connector_version, now))
+                        for connector_uuid, connector_version in connector_versions.items()
+                    ),
+                    order=order,
+                    has=tuple(from_positions(positions, len(order)) for positions in has),
+                    available=tuple(
+                        from_positions(positions, len(order)) for positions in available
+                    ),
+                    version=state.version if version is None else max(state.version, version - 1),
+                ),
+                [(None, True)],
+            )
+
+
+class StoreSnapshot:
+    """
+    Read-only view of a ConnectorStore at a given version.
+
+    It reads a single RegistryState, so that a series of reads, such as the ones serving
+    a request, are consistent with each other and with the version they report, whatever
+    is written to the store meanwhile. Taking a snapshot costs one allocation.
+    """
+
+    __slots__ = ("state", "_store")
+
+    def __init__(self, store: ConnectorStore, state: RegistryState):
+        self.state = state
+        # Only used for its read counters and epoch
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self.state.sources)
+
+    @property
+    def epoch(self) -> str:
+        return self._store.epoch
+
+    @property
+    def version(self) -> int:
+        return self.state.version
+
+    @property
+    def last_modified(self) -> float:
+        return self.state.last_modified
+
+    def get_connector(self, connector_uuid: UUID) -> Connector | None:
+        slots = self._lookup(connector_uuid)
+        return Connector(uuid=connector_uuid) if slots is not None else None
+
+    def list_connectors(self) -> list[Connector]:
+        return [Connector(uuid=UUID(int=connector_uuid)) for connector_uuid in self.state.order]
+
+    def get_source(self, connector_uuid: UUID, type: TypeEnum | str) -> ConnectorSource | None:
+        try:
+            code = SOURCE_TYPE_CODES[TypeEnum(type)]
+        except ValueError:
+            return None
+        record = (self._lookup(connector_uuid) or EMPTY_SLOTS)[code]
+        return to_source(connector_uuid, code, record) if record is not None else None
+
+    def list_sources(self, connector_uuid: UUID) -> list[ConnectorSource]:
+        return to_sources(connector_uuid, self._lookup(connector_uuid) or EMPTY_SLOTS)
+
+    def get_source_version(self, connector_uuid: UUID, type: TypeEnum | str) -> int | None:
+        """
+        Return the version of the source of a connector, None if it does not exist.
+        """
+        try:
+            code = SOURCE_TYPE_CODES[TypeEnum(type)]
+        except ValueError:
+            return None
+        record = (self._lookup(connector_uuid) or EMPTY_SLOTS)[code]
+        if record is None:
+            return None
+        return record.version or self.state.loaded[0]
+
+    def _lookup(self, connector_uuid: UUID) -> Slots | None:
+        slots = self.state.sources.get(connector_uuid.int)
+        if slots is None:
+            self._store.lookup_misses += 1
+        else:
+            self._store.lookup_hits += 1
+        return slots
+
+    ##
+    ##? Connectors and sources join
+    ##
+
+    # With `rendered`, connectors are rendered as JSON by the fast path rather than as models
+
+    def get_connector_and_sources(
+        self, connector_uuid: UUID, rendered: bool = False
+    ) -> ConnectorAndSources | RenderedConnector | None:
+        slots = self._lookup(connector_uuid)
+        if slots is None:
+            return None
+        if rendered:
+            return render_connector(connector_uuid.int, render_sources(slots))
+        return ConnectorAndSources(uuid=connector_uuid, sources=to_sources(connector_uuid, slots))
+
+    def list_connectors_and_sources(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        """
+        List the joined connectors ordered by UUID, starting at the given position.
+
+        With a filter, the position and limit apply to the matching connectors.
+        """
+        return self._list(0, offset, limit, filter, rendered)
+
+    def list_connectors_and_sources_after(
+        self,
+        after: UUID | None,
+        limit: int | None = None,
+        filter: ConnectorsFilter | None = None,
+        rendered: bool = False,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        """
+        List the joined connectors ordered by UUID, starting right after the given UUID.
+
+        This is a seek on the sorted index, in O(log N + limit), which stays stable
+        under concurrent writes unlike offset pagination.
+        """
+        start = 0 if after is None else bisect_right(self.state.order, after.int)
+        return self._list(start, 0, limit, filter, rendered)
+
+    def _list(
+        self,
+        start: int,
+        offset: int,
+        limit: int | None,
+        filter: ConnectorsFilter | None,
+        rendered: bool,
+    ) -> list[ConnectorAndSources] | list[RenderedConnector]:
+        # Connectors from the start position on, skipping the first `offset` ones
+        state = self.state
+        stop = None if limit is None else offset + limit
+        if filter is not None and not filter.is_empty():
+            self._store.scans += 1
+            positions = islice(iter_set_bits(match(state, filter), start), offset, stop)
+            return join(state, [state.order[position] for position in positions], rendered)
+        self._store.range_reads += 1
+        start += offset
+        stop = None if stop is None else start + limit
+        return join(state, state.order[start:stop], rendered)
+
+    def get_version(self, connector_uuid: UUID) -> tuple[int, float] | None:
+        """
+        Return the version and modification time of a connector, None if it does not exist.
+        """
+        state = self.state
+        version = state.versions.get(connector_uuid.int)
+        if version is None and connector_uuid.int in state.sources:
+            version = state.loaded
+        if version is None:
+            self._store.lookup_misses += 1
+        else:
+            self._store.lookup_hits += 1
+        return version
+
+
+def match(state: RegistryState, filter: ConnectorsFilter) -> int:
+    """
+    Return the bitset of the connectors matching a filter, over the sorted index.
+    """
+    match = (1 << len(state.order)) - 1
+    any_available = 0
+    for bits in state.available:
+        any_available |= bits
+    if filter.type is not None:
+        code = SOURCE_TYPE_CODES[filter.type]
+        if filter.available is None:
+            match &= state.has[code]
+        elif filter.available:
+            match &= state.available[code]
+        else:
+            match &= state.has[code] & ~state.available[code]
+    elif filter.available is not None:
+        if filter.available:
+            match &= any_available
+        else:
+            any_unavailable = 0
+            for has, available in zip(state.has, state.available):
+                any_unavailable |= has & ~available
+            match &= any_unavailable
+    if filter.has_available_source is not None:
+        match &= any_available if filter.has_available_source else ~any_available
+    return match
+
+
+def join(
+    state: RegistryState, uuids: list[int], rendered: bool = False
+) -> list[ConnectorAndSources] | list[RenderedConnector]:
+    sources = state.sources
+    if rendered:
+        return [
+            render_connector(connector_uuid, render_sources(sources[connector_uuid]))
+            for connector_uuid in uuids
+        ]
+    connectors = []
+    for connector_uuid in uuids:
+        slots = sources[connector_uuid]
+        connector_uuid = UUID(int=connector_uuid)
+        connectors.append(
+            ConnectorAndSources(uuid=connector_uuid, sources=to_sources(connector_uuid, slots))
+        )
+    return connectors
+
+
+def reindexed(state: RegistryState, updated_slots: dict[int, Slots]) -> RegistryState:
+    """
+    Return the state with the given connectors set to their new slots, and their bits refreshed.
+
+    Only the bits that change are rewritten, as each rewrite copies the whole bitset.
+    """
+    has, available = list(state.has), list(state.available)
+    for connector_uuid, slots in updated_slots.items():
+        position = bisect_left(state.order, connector_uuid)
+        for code, (old, new) in enumerate(zip(state.sources[connector_uuid], slots)):
+            if (old is None) != (new is None):
+                has[code] = set_bit(has[code], position, new is not None)
+            old_available = old is not None and old.available
+            new_available = new is not None and new.available
+            if old_available != new_available:
+                available[code] = set_bit(available[code], position, new_available)
+    return state._replace(
+        sources=state.sources.set(updated_slots.items()), has=tuple(has), available=tuple(available)
+    )
+
+
+def with_source(
+    slots: Slots, source: ConnectorSource, replace: bool = True, version: int = 0
+) -> Slots:
+    """
+    Return the slots of a connector with the given source set in the slot of its type, at
+    the given version.
+
+    Raises DuplicateSourceError if another slot holds a source with the same UUID, or if
+    the slot is already taken and `replace` is not set.
+    """
+    code = SOURCE_TYPE_CODES[source.type]
+    uuid = source.uuid.int
+    for other_code, record in enumerate(slots):
+        if record is None:
+            continue
+        if other_code == code and not replace:
+            raise DuplicateSourceError(
+                f"Connector {source.connector_uuid} has several {source.type.value} sources"
+            )
+        if other_code != code and record.uuid == uuid:
+            raise DuplicateSourceError(
+                f"Connector {source.connector_uuid} has several sources with UUID {source.uuid}"
+            )
+    return (*slots[:code], SourceRecord(uuid, source.available, version), *slots[code + 1 :])
+
+
+def check_version(source: ConnectorSource, version: int, current: int | None):
+    """
+    Raise VersionConflictError unless the current version of the source is the expected one.
+    """
+    if current != version:
+        raise VersionConflictError(
+            f"The {source.type.value} source of connector {source.connector_uuid} is at version"
+            f" {current}, not {version}",
+            current,
+        )
+
+
+def to_source(connector_uuid: UUID, code: int, record: SourceRecord) -> ConnectorSource:
+    return ConnectorSource(
+        connector_uuid=connector_uuid,
+        uuid=UUID(int=record.uuid),
+        type=SOURCE_TYPES[code],
+        available=record.available,
+    )
+
+
+def to_sources(connector_uuid: UUID, slots: Slots) -> list[ConnectorSource]:
+    return [
+        to_source(connector_uuid, code, record)
+        for code, record in enumerate(slots)
+        if record is not None
+    ]
+
+
+def render_sources(slots: Slots) -> list[str]:
+    return [
+        render_source(record.uuid, SOURCE_TYPE_VALUES[code], record.available)
+        for code, record in enumerate(slots)
+        if record is not None
+    ]
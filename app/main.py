@@ -1,14 +1,37 @@
-from fake_data.db import lifespan
-from fastapi import FastAPI
+from config import METRICS, PROFILING, PROFILING_SAMPLE_RATE
+from fake_data.db import SHARED_REGISTRY, lifespan
+from fastapi import FastAPI, Request
 
 # from routers.connector_sources import router as connector_sources_router
 # from routers.connectors import router as connector_router
 from routers.connectors_and_sources import router as connectors_and_sources_router
+from routers.metrics import REQUEST_METRICS
+from routers.metrics import router as metrics_router
+from routers.profiles import PROFILES
+from routers.profiles import router as profiles_router
+from utils.profiling import ProfilingMiddleware
 
 app = FastAPI(lifespan=lifespan)
 app.openapi_version = "3.0.1"
 
+if SHARED_REGISTRY is not None:
+
+    @app.middleware("http")
+    async def sync_shared_registry(request: Request, call_next):
+        # Serve the writes acknowledged by the other workers, not only the polled ones
+        SHARED_REGISTRY.sync()
+        return await call_next(request)
+
+
 # Include the router in the app
 # app.include_router(connector_router)
 # app.include_router(connector_sources_router)
 app.include_router(connectors_and_sources_router)
+app.include_router(metrics_router)
+
+if PROFILING:
+    app.include_router(profiles_router)
+    app.add_middleware(ProfilingMiddleware, store=PROFILES, sample_rate=PROFILING_SAMPLE_RATE)
+
+if METRICS:
+    REQUEST_METRICS.instrument(app)
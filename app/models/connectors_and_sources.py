@@ -6,6 +6,7 @@ from pydantic import (
     ConfigDict,
     Field,
     PositiveInt,
+    field_validator,
     root_validator,
 )
 
@@ -99,9 +100,17 @@ class ConnectorAndSources(BaseModel):
     sources: list[ConnectorSource] = Field(
         ...,
         title="Connector sources",
-        description="The list of sources for the connector",
+        description="The list of sources for the connector, at most one per type",
     )
 
+    @field_validator("sources")
+    def check_unique_sources(cls, sources):
+        if len({source.type for source in sources}) != len(sources):
+            raise ValueError("A connector has at most one source per type")
+        if len({source.uuid for source in sources}) != len(sources):
+            raise ValueError("The sources of a connector must have distinct UUIDs")
+        return sources
+
     model_config = ConfigDict(
         json_schema_extra={
             "example": {
@@ -135,6 +144,11 @@ class ConnectorsAndSourcesList(BaseModel):
     connectors: list[ConnectorAndSources] = Field(
         ..., title="Connectors", description="The list of connectors and their sources"
     )
+    next_cursor: str | None = Field(
+        None,
+        title="Next cursor",
+        description="Opaque cursor to pass as `cursor` to fetch the next page, null on the last page",
+    )
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -186,12 +200,38 @@ class ConnectorsAndSourcesList(BaseModel):
                             },
                         ],
                     },
-                ]
+                ],
+                "next_cursor": "Ej5FZ-ibEtOkVkJmFBdAAQ",
             }
         }
     )
 
 
+class ConnectorsFilter(BaseModel):
+    type: TypeEnum | None = Field(
+        None,
+        title="Source type",
+        description="Only connectors having a source of this type. "
+        "Combined with `available`, the availability of that source is checked.",
+    )
+    available: bool | None = Field(
+        None,
+        title="Available",
+        description="Only connectors having a source (of `type` if set) with this availability",
+    )
+    has_available_source: bool | None = Field(
+        None,
+        title="Has available source",
+        description="Only connectors having at least one available source (true) or none (false)",
+    )
+
+    # Hashable, so that it can be part of a cache key
+    model_config = ConfigDict(frozen=True)
+
+    def is_empty(self) -> bool:
+        return self.type is None and self.available is None and self.has_available_source is None
+
+
 class ConnectorSourceUpdate(BaseModel):
     type: TypeEnum = Field(
         ...,
@@ -208,6 +248,13 @@ class ConnectorSourceUpdate(BaseModel):
         title="Available",
         description="Whether the source is set as available or not",
     )
+    version: str | None = Field(
+        None,
+        pattern=r"^[0-9a-f]+\.[0-9]+$",
+        title="Expected version",
+        description="Version of the source the update is based on, its ETag without quotes. "
+        "When set, the update only applies if the source is still at that version.",
+    )
 
     @root_validator(pre=True)
     def check_available_field(cls, values):
@@ -233,3 +280,115 @@ class ConnectorsAndSourcesUpdate(BaseModel):
     connectors: list[ConnectorAndSourcesUpdate] = Field(
         ..., title="Connectors update", description="The connectors and their sources to update"
     )
+
+
+class ConnectorSourceUpdateResult(BaseModel):
+    connector_uuid: UUID = Field(
+        ...,
+        title="Connector UUID",
+        description="The unique identifier for the connector",
+    )
+    type: TypeEnum = Field(
+        ...,
+        title="Connector source type",
+        description="The type of the connector source",
+    )
+    status_code: int = Field(
+        ...,
+        title="Status code",
+        description="The HTTP status code of this update (200, 404, 409, 412 or 428)",
+    )
+    detail: str | None = Field(
+        None,
+        title="Detail",
+        description="The reason why the update was not applied, if any",
+    )
+
+
+class ConnectorsAndSourcesUpdateResult(BaseModel):
+    results: list[ConnectorSourceUpdateResult] = Field(
+        ...,
+        title="Update results",
+        description="The result of each source update, in the order of the request",
+    )
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [
+                    {
+                        "connector_uuid": "123e4567-e89b-12d3-a456-426614174000",
+                        "type": "openapi",
+                        "status_code": 200,
+                        "detail": None,
+                    },
+                    {
+                        "connector_uuid": "123e4567-e89b-12d3-a456-426614174009",
+                        "type": "openapi",
+                        "status_code": 404,
+                        "detail": "Connector not found",
+                    },
+                ]
+            }
+        }
+    )
+
+
+class RegistryChange(BaseModel):
+    seq: int = Field(
+        ...,
+        title="Sequence number",
+        description="The sequence number of the change, also the registry version after it",
+    )
+    connector_uuid: UUID = Field(
+        ...,
+        title="Connector UUID",
+        description="The unique identifier for the connector that changed",
+    )
+    deleted: bool = Field(
+        ...,
+        title="Deleted",
+        description="Whether the connector was deleted",
+    )
+    connector: ConnectorAndSources | None = Field(
+        None,
+        title="Connector",
+        description="The connector and its sources after the change, null if it was deleted",
+    )
+
+
+class RegistryChangesList(BaseModel):
+    changes: list[RegistryChange] = Field(
+        ..., title="Changes", description="The changes in sequence order"
+    )
+    last_seq: str = Field(
+        ...,
+        title="Last sequence number",
+        description="The sequence number of the last change, qualified by the registry epoch, "
+        "to pass as `since` to get the next changes",
+    )
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "changes": [
+                    {
+                        "seq": 14,
+                        "connector_uuid": "123e4567-e89b-12d3-a456-426614174000",
+                        "deleted": False,
+                        "connector": {
+                            "uuid": "123e4567-e89b-12d3-a456-426614174000",
+                            "sources": [
+                                {
+                                    "uuid": "eb4bbb24-0ef2-11f0-ae6f-429fb861f004",
+                                    "type": "openapi",
+                                    "available": True,
+                                },
+                            ],
+                        },
+                    }
+                ],
+                "last_seq": "6a345d8e.14",
+            }
+        }
+    )
@@ -1,24 +1,76 @@
+import base64
+import binascii
+import json
+from collections.abc import AsyncIterator, Hashable
+from contextlib import AsyncExitStack
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
 from uuid import UUID
 
-from fake_data.db import CONNECTORS_DB, SOURCES_DB
-from fastapi import APIRouter, HTTPException, Query
+from config import FAST_JSON, REQUIRE_IF_MATCH, RESPONSE_CACHE_SIZE, VALIDATE_RESPONSES
+from fake_data.changelog import ChangesExpired
+from fake_data.db import CHANGELOG, REPOSITORY
+from fake_data.repository import ConnectorRepository, RegistrySnapshot
+from fake_data.store import DuplicateSourceError, VersionConflictError
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import Response, StreamingResponse
+from models.connectors import Connector
 from models.connectors_and_sources import (
     ConnectorAndSources,
     ConnectorsAndSourcesList,
     ConnectorsAndSourcesUpdate,
+    ConnectorsAndSourcesUpdateResult,
+    ConnectorsFilter,
     ConnectorSource,
+    ConnectorSourceUpdateResult,
+    RegistryChange,
+    RegistryChangesList,
     TypeEnum,
 )
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from utils.fast_json import RenderedConnector, RenderedConnectorsList, dump_json
+from utils.response_cache import ResponseCache
 
 router = APIRouter(prefix="/connectors", tags=["connectors"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Serialized connectors are flushed by chunks of this size when streaming
+NDJSON_CHUNK_SIZE = 64 * 1024
+# Connectors read from the registry at once when streaming
+NDJSON_BATCH_SIZE = 1000
+SSE_MEDIA_TYPE = "text/event-stream"
+# Interval between two keep-alive comments on idle Server-Sent Events streams
+SSE_KEEPALIVE_INTERVAL = 15
+# Version of the registry snapshot a response was read from
+REGISTRY_VERSION_HEADER = "X-Registry-Version"
+
+# With the fast JSON path, connectors are read already serialized
+ConnectorsList = RenderedConnectorsList if FAST_JSON else ConnectorsAndSourcesList
+
+# Serialized GET responses, invalidated by the store on every mutation
+RESPONSE_CACHE = ResponseCache(maxsize=RESPONSE_CACHE_SIZE)
+REPOSITORY.subscribe(RESPONSE_CACHE.invalidate)
+
 ##
 ##? GET
 ##
 
 
-@router.get("", response_model=ConnectorsAndSourcesList)
-def retrieve_connectors(
+@router.get(
+    "",
+    response_model=ConnectorsAndSourcesList,
+    responses={
+        200: {
+            "content": {NDJSON_MEDIA_TYPE: {}},
+            "description": "With `all=true` and `format=ndjson`, one connector per line",
+        },
+        304: {"description": "The connectors did not change since the given ETag or date"},
+    },
+)
+async def retrieve_connectors(
+    request: Request,
     page: int = Query(
         1, ge=1, description="Page number for pagination. Must be greater than or equal to 1."
     ),
@@ -26,49 +78,280 @@ def retrieve_connectors(
         3, ge=1, description="Number of connectors per page. Must be greater than or equal to 1."
     ),
     all: bool = Query(None, description="If True, returns all connectors without pagination."),
+    cursor: str = Query(
+        None,
+        description="Opaque cursor returned as `next_cursor` by a previous call. "
+        "When provided, `page` is ignored and the page starting after the cursor is returned.",
+    ),
+    format: str = Query(
+        None,
+        pattern="^(json|ndjson)$",
+        description=(
+            "Response format. 'ndjson' streams one connector per line, only with `all=true`."
+        ),
+    ),
+    type: TypeEnum = Query(
+        None,
+        description="Only connectors having a source of this type. "
+        "Combined with `available`, the availability of that source is checked.",
+    ),
+    available: bool = Query(
+        None,
+        description="Only connectors having a source (of `type` if set) with this availability.",
+    ),
+    has_available_source: bool = Query(
+        None,
+        description="Only connectors having at least one available source (true) or none (false).",
+    ),
+    accept: str = Header(None, include_in_schema=False),
 ) -> ConnectorsAndSourcesList:
     """
-    Retrieve a list of connectors and their associated sources.
+    Retrieve a list of connectors and their associated sources, ordered by connector UUID.
 
-    It supports pagination and an option to retrieve all connectors and sources at once.
+    It supports cursor-based pagination (follow `next_cursor`), offset pagination with
+    `page` and `limit` for compatibility, and an option to retrieve all connectors and
+    sources at once.
+
+    Connectors can be filtered on their sources, e.g. `type=openapi&available=false` for
+    the connectors whose openapi source is unavailable, or `has_available_source=false`.
+    Pagination applies to the matching connectors.
+
+    All connectors can be streamed as NDJSON with `format=ndjson` or an
+    `Accept: application/x-ndjson` header, so that consumers can start processing
+    the registry before it is entirely rendered.
+
+    The response carries the collection version, qualified by the registry epoch, as ETag,
+    and conditional requests (If-None-Match, If-Modified-Since) get a 304 when nothing
+    changed since. Pages are read from a single version of the registry, reported in the
+    X-Registry-Version header.
     """
-    connectors_dict = {connector.uuid: connector for connector in CONNECTORS_DB}
-    sources_dict = {}
+    stream = format == "ndjson" or (
+        format is None and accept is not None and NDJSON_MEDIA_TYPE in accept
+    )
+    if stream and not all:
+        raise HTTPException(
+            status_code=400, detail="The 'ndjson' format is only available with all=true"
+        )
+    filter = ConnectorsFilter(
+        type=type, available=available, has_available_source=has_available_source
+    )
+    if filter.is_empty():
+        filter = None
+
+    # Both formats are distinct representations, so they must not share ETags
+    # Read before the registry, so that a body read before a write is not cached after it
+    generation = RESPONSE_CACHE.generation
+    async with AsyncExitStack() as stack:
+        registry = await stack.enter_async_context(REPOSITORY.snapshot())
+        headers = validator_headers(
+            registry.epoch, registry.version, registry.last_modified, "-ndjson" if stream else ""
+        )
+        headers[REGISTRY_VERSION_HEADER] = str(registry.version)
+        return await list_connectors_response(
+            request, registry, stack, headers, generation, stream, all, cursor, page, limit, filter
+        )
 
-    for source in SOURCES_DB:
-        if source.connector_uuid in connectors_dict:
-            if source.connector_uuid not in sources_dict:
-                sources_dict[source.connector_uuid] = []
-            sources_dict[source.connector_uuid].append(source)
 
-    connectors_and_sources = []
-    for connector_uuid, connector in connectors_dict.items():
-        connector_sources = sources_dict.get(connector_uuid, [])
-        connectors_and_sources.append(
-            ConnectorAndSources(uuid=connector.uuid, sources=connector_sources)
+async def list_connectors_response(
+    request: Request,
+    registry: RegistrySnapshot,
+    stack: AsyncExitStack,
+    headers: dict[str, str],
+    generation: int,
+    stream: bool,
+    all: bool | None,
+    cursor: str | None,
+    page: int,
+    limit: int,
+    filter: ConnectorsFilter | None,
+) -> Response:
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+
+    if stream:
+        # The snapshot is read batch by batch as the response is sent, then closed by the
+        # stream, or after the response when the client left before its end
+        snapshot = stack.pop_all()
+        return StreamingResponse(
+            iter_ndjson(registry, filter, snapshot),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=headers,
+            background=BackgroundTask(snapshot.aclose),
         )
 
     if all:
-        return ConnectorsAndSourcesList(connectors=connectors_and_sources)
+        cache_key = ("all", filter)
+    elif cursor is not None:
+        after = decode_cursor(cursor)
+        cache_key = ("cursor", after, limit, filter)
+    else:
+        cache_key = ("page", page, limit, filter)
 
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_connectors = connectors_and_sources[start:end]
+    body = RESPONSE_CACHE.get(cache_key, registry.version)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    # Only the requested page is read and joined
+    if all:
+        connectors_list = ConnectorsList(
+            connectors=await registry.list_connectors_and_sources(filter=filter, rendered=FAST_JSON)
+        )
+        return cached_response(
+            cache_key,
+            connectors_list,
+            ConnectorsAndSourcesList,
+            generation,
+            registry.version,
+            headers,
+        )
 
-    return ConnectorsAndSourcesList(connectors=paginated_connectors)
+    # Fetch one extra connector to know whether there is a next page
+    if cursor is not None:
+        paginated_connectors = await registry.list_connectors_and_sources_after(
+            after, limit=limit + 1, filter=filter, rendered=FAST_JSON
+        )
+    else:
+        paginated_connectors = await registry.list_connectors_and_sources(
+            offset=(page - 1) * limit, limit=limit + 1, filter=filter, rendered=FAST_JSON
+        )
 
+    next_cursor = None
+    if len(paginated_connectors) > limit:
+        paginated_connectors = paginated_connectors[:limit]
+        next_cursor = encode_cursor(paginated_connectors[-1].uuid)
 
-@router.get("/{connector_uuid}", response_model=ConnectorAndSources)
-def retrieve_connector(connector_uuid: UUID) -> ConnectorAndSources:
-    connector = get_connector_by_uuid(connector_uuid)
+    connectors_list = ConnectorsList(connectors=paginated_connectors, next_cursor=next_cursor)
+    return cached_response(
+        cache_key, connectors_list, ConnectorsAndSourcesList, generation, registry.version, headers
+    )
 
-    # Get all sources associated with this connector
-    connector_sources = []
-    for source in SOURCES_DB:
-        if source.connector_uuid == connector_uuid:
-            connector_sources.append(source)
 
-    return ConnectorAndSources(uuid=connector.uuid, sources=connector_sources)
+@router.get(
+    "/changes",
+    response_model=RegistryChangesList,
+    responses={
+        200: {
+            "content": {SSE_MEDIA_TYPE: {}},
+            "description": "With `Accept: text/event-stream`, one `change` event per change",
+        },
+        410: {"description": "The changes since the given sequence number are not available"},
+    },
+)
+async def retrieve_changes(
+    request: Request,
+    since: str = Query(
+        ...,
+        pattern=r'^"?[0-9a-f]+\.[0-9]+(-ndjson)?"?$',
+        description="Sequence number of the last change already seen, qualified by the "
+        "registry epoch: the `last_seq` of a previous call, or the ETag of a full listing "
+        "to start following the changes after it.",
+    ),
+    limit: int = Query(1000, ge=1, description="Maximum number of changes to return."),
+    timeout: float = Query(
+        0,
+        ge=0,
+        le=60,
+        description="Long-polling: seconds to wait for a change when there is none yet.",
+    ),
+) -> RegistryChangesList:
+    """
+    Retrieve the changes of the registry after a given sequence number, oldest first.
+
+    Each change holds the new state of the connector, so that consumers can keep a replica
+    of the registry up to date. Only the latest changes are kept, a 410 means the consumer
+    has to resync from a full listing: the changes since the sequence number were dropped,
+    or it is from another epoch (e.g. before the registry restarted) or was never reached.
+
+    With `Accept: text/event-stream`, changes are pushed as Server-Sent Events, resuming
+    after the `Last-Event-ID` header when provided.
+    """
+    seq = parse_version(CHANGELOG.epoch, since)
+    if SSE_MEDIA_TYPE in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id:
+            seq = parse_version(CHANGELOG.epoch, last_event_id)
+        # Fail with a 410 before the stream starts if the changes are not available
+        get_changes_since(seq, limit)
+        return StreamingResponse(iter_change_events(seq, limit), media_type=SSE_MEDIA_TYPE)
+
+    changes = get_changes_since(seq, limit)
+    if not changes and timeout:
+        await CHANGELOG.wait(seq, timeout)
+        changes = get_changes_since(seq, limit)
+
+    # Without changes, the consumer is up to date at its sequence number
+    return model_response(
+        RegistryChangesList(
+            changes=changes,
+            last_seq=f"{CHANGELOG.epoch}.{changes[-1].seq if changes else seq}",
+        )
+    )
+
+
+@router.get(
+    "/{connector_uuid}",
+    response_model=ConnectorAndSources,
+    responses={304: {"description": "The connector did not change since the given ETag or date"}},
+)
+async def retrieve_connector(request: Request, connector_uuid: UUID) -> ConnectorAndSources:
+    """
+    Retrieve a connector and its sources.
+
+    The response carries the connector version, qualified by the registry epoch, as ETag,
+    and conditional requests (If-None-Match, If-Modified-Since) get a 304 when the connector
+    did not change since.
+    """
+    # Read before the registry, so that a body read before a write is not cached after it
+    generation = RESPONSE_CACHE.generation
+    async with REPOSITORY.snapshot() as registry:
+        version = await registry.get_version(connector_uuid)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Connector not found")
+
+        headers = validator_headers(registry.epoch, *version)
+        headers[REGISTRY_VERSION_HEADER] = str(registry.version)
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        # Cached at the version of the connector, which other connectors' writes leave as is
+        cache_key = ("connector", connector_uuid)
+        body = RESPONSE_CACHE.get(cache_key, version[0])
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        connector = await registry.get_connector_and_sources(connector_uuid, rendered=FAST_JSON)
+        return cached_response(
+            cache_key,
+            connector,
+            ConnectorAndSources,
+            generation,
+            version[0],
+            headers,
+            connector_uuid,
+        )
+
+
+@router.get("/{connector_uuid}/sources/{source_type}", response_model=ConnectorSource)
+async def retrieve_source(
+    connector_uuid: UUID, source_type: str, response: Response
+) -> ConnectorSource:
+    """
+    Retrieve a source of a connector.
+
+    The response carries the source version as ETag, to be sent as If-Match when updating
+    the source.
+    """
+    async with REPOSITORY.snapshot() as registry:
+        source = await get_source_by_type(connector_uuid, source_type, registry)
+        version = await registry.get_source_version(connector_uuid, source.type)
+        return model_response(
+            source,
+            {
+                "ETag": source_etag(registry.epoch, version),
+                REGISTRY_VERSION_HEADER: str(registry.version),
+            },
+            response,
+        )
 
 
 ##
@@ -77,7 +360,7 @@ def retrieve_connector(connector_uuid: UUID) -> ConnectorAndSources:
 
 
 @router.put("/{connector_uuid}", response_model=ConnectorAndSources)
-def create_or_update_connector(
+async def create_or_update_connector(
     connector_uuid: UUID,
 ) -> ConnectorAndSources:
     """
@@ -97,17 +380,16 @@ def create_or_update_connector(
 
     try:
         # Try to get the existing connector
-        existing_connector = get_connector_by_uuid(connector_uuid)
-        return existing_connector
+        await get_connector_by_uuid(connector_uuid)
+        return await REPOSITORY.get_connector_and_sources(connector_uuid)
     except HTTPException:
         # Connector doesn't exist, create a new one
-        new_connector = ConnectorAndSources(uuid=connector_uuid, sources=[])
-        CONNECTORS_DB.append(new_connector)
-        return new_connector
+        await REPOSITORY.upsert_connector(Connector(uuid=connector_uuid))
+        return await REPOSITORY.get_connector_and_sources(connector_uuid)
 
 
 @router.put("/{connector_uuid}/sources", response_model=ConnectorAndSources)
-def create_or_update_source(
+async def create_or_update_source(
     connector_uuid: UUID,
     source: ConnectorSource,
 ) -> ConnectorAndSources:
@@ -130,28 +412,18 @@ def create_or_update_source(
     # The code below will never execute but shows the intended implementation
 
     # Find the connector (will raise 404 if not found)
-    existing_connector = get_connector_by_uuid(connector_uuid)
+    existing_connector = await get_connector_by_uuid(connector_uuid)
 
     # Ensure the source has the correct connector_uuid
     source.connector_uuid = connector_uuid
 
-    # Check if source already exists
-    for i, existing_source in enumerate(SOURCES_DB):
-        if existing_source.connector_uuid == connector_uuid and existing_source.type == source.type:
-            # Update the existing source
-            SOURCES_DB[i] = source
-            break
-    else:
-        # Source doesn't exist, add it
-        SOURCES_DB.append(source)
-
-    # Get all sources associated with this connector to return
-    connector_sources = []
-    for db_source in SOURCES_DB:
-        if db_source.connector_uuid == connector_uuid:
-            connector_sources.append(db_source)
+    # Update the source with the same type, or add it
+    try:
+        await REPOSITORY.upsert_sources([source])
+    except DuplicateSourceError as error:
+        raise HTTPException(status_code=409, detail=str(error))
 
-    return ConnectorAndSources(uuid=connector_uuid, sources=connector_sources)
+    return await REPOSITORY.get_connector_and_sources(connector_uuid)
 
 
 ##
@@ -159,8 +431,82 @@ def create_or_update_source(
 ##
 
 
+@router.patch("", response_model=ConnectorsAndSourcesUpdateResult)
+async def update_sources_availability(
+    connectors_update: ConnectorsAndSourcesUpdate,
+) -> ConnectorsAndSourcesUpdateResult:
+    """
+    Bulk update of the 'available' field of sources across many connectors.
+
+    Each source is identified by its connector UUID and type, and its UUID must match the
+    existing source. Updates are applied independently: the result of each one is reported
+    with its own status code (200 updated, 404 connector or source not found, 409 source
+    UUID mismatch), in the order of the request.
+
+    Like the If-Match header of a single source PATCH, the `version` of an update makes it
+    conditional: it only applies if the source is still at that version, and gets a 412
+    otherwise. Conditional updates are applied one by one as they come, then the others
+    all at once. When the server requires If-Match, updates without a version get a 428.
+
+    This operation will not create new resources, and it cannot update other connector fields.
+    """
+    results = []
+    # Conditional updates, with their result and the version they expect
+    conditional_updates = []
+    updated_sources = {}
+    async with REPOSITORY.snapshot() as registry:
+        for connector_update in connectors_update.connectors:
+            connector_found = await registry.get_version(connector_update.uuid) is not None
+            for source_update in connector_update.sources:
+                result = ConnectorSourceUpdateResult(
+                    connector_uuid=connector_update.uuid, type=source_update.type, status_code=200
+                )
+                results.append(result)
+
+                source = await registry.get_source(connector_update.uuid, source_update.type)
+                if not connector_found:
+                    result.status_code, result.detail = 404, "Connector not found"
+                elif source is None:
+                    result.status_code, result.detail = 404, "Source not found"
+                elif source.uuid != source_update.uuid:
+                    result.status_code, result.detail = 409, "Source UUID does not match"
+                elif source_update.version is not None:
+                    conditional_updates.append(
+                        (
+                            result,
+                            source.model_copy(update={"available": source_update.available}),
+                            parse_version(registry.epoch, source_update.version),
+                        )
+                    )
+                elif REQUIRE_IF_MATCH:
+                    result.status_code, result.detail = 428, "The source version must be provided"
+                else:
+                    # Later updates of the same source in the request take precedence
+                    source = updated_sources.get((source.connector_uuid, source.type), source)
+                    if source.available != source_update.available:
+                        updated_sources[(source.connector_uuid, source.type)] = source.model_copy(
+                            update={"available": source_update.available}
+                        )
+
+    # Checked against the version of the source when it is written, while a version of
+    # another epoch tells nothing of the current source
+    for result, source, version in conditional_updates:
+        if version is None:
+            result.status_code, result.detail = 412, "The source changed since its version"
+            continue
+        try:
+            await REPOSITORY.upsert_source(source, if_version=version)
+        except VersionConflictError:
+            result.status_code, result.detail = 412, "The source changed since its version"
+
+    # Apply all the unconditional changes at once, unchanged sources are left untouched
+    await REPOSITORY.upsert_sources(updated_sources.values())
+
+    return model_response(ConnectorsAndSourcesUpdateResult(results=results))
+
+
 @router.patch("/{connector_uuid}", response_model=ConnectorAndSources)
-def update_connector(
+async def update_connector(
     connector_uuid: UUID,
 ) -> ConnectorAndSources:
     """
@@ -171,7 +517,7 @@ def update_connector(
     **DEMO ONLY**: This functionality is planned for future implementation.
     """
     # Find the connector (will raise 404 if not found)
-    existing_connector = get_connector_by_uuid(connector_uuid)
+    existing_connector = await get_connector_by_uuid(connector_uuid)
 
     # Future implementation for updating connector fields
     # 501 Not Implemented: This indicates that the server does not support the functionality requiredto fulfill the
@@ -184,11 +530,22 @@ def update_connector(
     # return ConnectorAndSources(uuid=connector_uuid, sources=existing_connector.sources)
 
 
-@router.patch("/{connector_uuid}/sources/{source_type}", response_model=ConnectorAndSources)
-def update_source(
+@router.patch(
+    "/{connector_uuid}/sources/{source_type}",
+    response_model=ConnectorAndSources,
+    responses={
+        412: {"description": "The source changed since the ETag given as If-Match"},
+        428: {"description": "An If-Match header is required"},
+    },
+)
+async def update_source(
     connector_uuid: UUID,
     source_type: str,
+    response: Response,
     available: bool = None,
+    if_match: str = Header(
+        None, description="ETag of the source the update is based on, as returned by its GET."
+    ),
 ) -> ConnectorAndSources:
     """
     Partial update of a specific source of a connector.
@@ -197,29 +554,58 @@ def update_source(
     Currently, only the 'available' field can be updated.
 
     source_type must be one of: 'openapi', 'directaccess', 'fallback'.
+
+    The version of the source is its ETag, returned by GET on the source and by this endpoint.
+    With an If-Match header, the update only applies if the source is still at that version,
+    and a 412 carrying the current ETag is returned otherwise, so that concurrent updates
+    are never lost: clients re-read the source and retry. The header may be required by
+    the server configuration, a 428 is then returned without it.
     """
     # Find the connector (will raise 404 if not found)
-    existing_connector = get_connector_by_uuid(connector_uuid)
+    existing_connector = await get_connector_by_uuid(connector_uuid)
 
-    # Find the source (will raise 404 if not found)
-    source = get_source_by_type(connector_uuid, source_type)
+    async with REPOSITORY.snapshot() as registry:
+        # Find the source (will raise 404 if not found)
+        source = await get_source_by_type(connector_uuid, source_type, registry)
+        version = await registry.get_source_version(connector_uuid, source.type)
+        epoch = registry.epoch
 
-    # Update the 'available' field if provided
-    if available is not None:
-        source.available = available
-    else:
+    if available is None:
         raise HTTPException(
             status_code=400,
             detail="The 'available' parameter must be provided when updating a source",
         )
 
-    # Get all sources associated with this connector to return
-    connector_sources = []
-    for db_source in SOURCES_DB:
-        if db_source.connector_uuid == connector_uuid:
-            connector_sources.append(db_source)
+    # Only write if the source is still at the version the If-Match was checked against,
+    # but for "*" which only requires the source to exist
+    if_version = None
+    if if_match is not None:
+        if not matches_if_match(if_match, source_etag(epoch, version)):
+            raise precondition_failed(epoch, version)
+        if if_match.strip() != "*":
+            if_version = version
+    elif REQUIRE_IF_MATCH:
+        raise HTTPException(
+            status_code=428, detail="The If-Match header must be provided when updating a source"
+        )
 
-    return ConnectorAndSources(uuid=connector_uuid, sources=connector_sources)
+    try:
+        await REPOSITORY.upsert_source(
+            source.model_copy(update={"available": available}), if_version=if_version
+        )
+    except VersionConflictError as error:
+        raise precondition_failed(epoch, error.version)
+
+    async with REPOSITORY.snapshot() as registry:
+        headers = {REGISTRY_VERSION_HEADER: str(registry.version)}
+        version = await registry.get_source_version(connector_uuid, source.type)
+        if version is not None:
+            headers["ETag"] = source_etag(registry.epoch, version)
+        return model_response(
+            await registry.get_connector_and_sources(connector_uuid, rendered=FAST_JSON),
+            headers,
+            response,
+        )
 
 
 ##
@@ -228,7 +614,7 @@ def update_source(
 
 
 @router.delete("/{connector_uuid}", response_model=ConnectorAndSources)
-def delete_connector(
+async def delete_connector(
     connector_uuid: UUID,
 ) -> ConnectorAndSources:
     """
@@ -243,26 +629,17 @@ def delete_connector(
     )
 
     # The code below will never execute but shows the intended implementation
-    existing_connector = get_connector_by_uuid(connector_uuid)
-
-    # Store connector before deletion for the response
-    deleted_connector = ConnectorAndSources(uuid=existing_connector.uuid, sources=[])
-
-    # First delete all sources associated with this connector
-    for source in list(SOURCES_DB):  # Create a copy of the list to safely modify during iteration
-        if source.connector_uuid == connector_uuid:
-            deleted_connector.sources.append(source)
-            SOURCES_DB.remove(source)
+    existing_connector = await get_connector_by_uuid(connector_uuid)
 
-    # Then delete the connector itself
-    CONNECTORS_DB.remove(existing_connector)
+    # Delete the connector along with all its sources
+    _, deleted_sources = await REPOSITORY.delete_connector(existing_connector.uuid)
 
     # Return the deleted connector and its sources for confirmation
-    return deleted_connector
+    return ConnectorAndSources(uuid=existing_connector.uuid, sources=deleted_sources)
 
 
 @router.delete("/{connector_uuid}/sources/{source_type}", response_model=ConnectorAndSources)
-def delete_source(
+async def delete_source(
     connector_uuid: UUID,
     source_type: str,
 ) -> ConnectorAndSources:
@@ -282,33 +659,22 @@ def delete_source(
     # The code below will never execute but shows the intended implementation
 
     # Find the connector (will raise 404 if not found)
-    connector = get_connector_by_uuid(connector_uuid)
+    connector = await get_connector_by_uuid(connector_uuid)
 
     # Find and remove the specified source
-    deleted_source = None
-    for i, source in enumerate(SOURCES_DB):
-        if source.connector_uuid == connector_uuid and source.type == source_type:
-            deleted_source = source
-            SOURCES_DB.remove(source)
-            break
-
-    if not deleted_source:
+    try:
+        await REPOSITORY.delete_source(connector_uuid, source_type)
+    except KeyError:
         raise HTTPException(
             status_code=404,
             detail=f"Source with type '{source_type}' not found for connector '{connector_uuid}'",
         )
 
-    # Get the updated list of sources for this connector to return
-    remaining_sources = []
-    for source in SOURCES_DB:
-        if source.connector_uuid == connector_uuid:
-            remaining_sources.append(source)
-
-    return ConnectorAndSources(uuid=connector_uuid, sources=remaining_sources)
+    return await REPOSITORY.get_connector_and_sources(connector_uuid)
 
 
 @router.delete("/{connector_uuid}", response_model=ConnectorsAndSourcesList)
-def delete_connector_and_or_source(
+async def delete_connector_and_or_source(
     connector_uuid: UUID,
     source_type: str = None,
 ) -> ConnectorsAndSourcesList:
@@ -327,29 +693,31 @@ def delete_connector_and_or_source(
     )
 
     # The code below will never execute but shows the intended implementation
-    existing_connector = get_connector_by_uuid(connector_uuid)
+    existing_connector = await get_connector_by_uuid(connector_uuid)
 
     # If source_type is provided, delete only that source
     if source_type:
         # Find and remove the specified source
-        for i, source in enumerate(existing_connector.sources):
-            if source.type == source_type:
-                existing_connector.sources.pop(i)
-                break
-        else:
+        try:
+            await REPOSITORY.delete_source(connector_uuid, source_type)
+        except KeyError:
             raise HTTPException(
                 status_code=404, detail=f"Source with type '{source_type}' not found"
             )
 
-        return ConnectorsAndSourcesList(connectors=[existing_connector])
+        return ConnectorsAndSourcesList(
+            connectors=[await REPOSITORY.get_connector_and_sources(connector_uuid)]
+        )
 
     # Otherwise, delete the entire connector
     else:
         # Remove the connector from the database (would happen if enabled)
-        CONNECTORS_AND_SOURCES_DB.remove(existing_connector)
+        _, deleted_sources = await REPOSITORY.delete_connector(connector_uuid)
 
         # Return the deleted connector for confirmation
-        return ConnectorsAndSourcesList(connectors=[existing_connector])
+        return ConnectorsAndSourcesList(
+            connectors=[ConnectorAndSources(uuid=existing_connector.uuid, sources=deleted_sources)]
+        )
 
 
 ##
@@ -357,35 +725,230 @@ def delete_connector_and_or_source(
 ##
 
 
-def get_connector_by_uuid(uuid: UUID) -> ConnectorAndSources:
-    for connector in CONNECTORS_DB:
-        if connector.uuid == uuid:
-            return connector
-    raise HTTPException(status_code=404, detail="Connector not found")
+async def get_connector_by_uuid(uuid: UUID) -> Connector:
+    connector = await REPOSITORY.get_connector(uuid)
+    if connector is None:
+        raise HTTPException(status_code=404, detail="Connector not found")
+    return connector
 
 
-def get_source_by_type(connector_uuid: UUID, type: str) -> ConnectorSource:
-    for source in SOURCES_DB:
-        if source.connector_uuid == connector_uuid and source.type == type:
-            return source
-    raise HTTPException(status_code=404, detail="Source not found")
+async def get_source_by_type(
+    connector_uuid: UUID,
+    type: str,
+    registry: ConnectorRepository | RegistrySnapshot = REPOSITORY,
+) -> ConnectorSource:
+    source = await registry.get_source(connector_uuid, type)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return source
+
+
+def cached_response(
+    cache_key: Hashable,
+    model: BaseModel | RenderedConnector | RenderedConnectorsList,
+    response_model: type[BaseModel],
+    generation: int,
+    version: int,
+    headers: dict[str, str],
+    connector_uuid: UUID | None = None,
+) -> Response:
+    """
+    Serialize a response model, and cache the body for the version of its ETag, until the
+    connector it renders changes, or until any change for a listing.
+
+    Cached bodies are served as is, so with VALIDATE_RESPONSES the model is validated
+    against the response_model of the route before it is cached.
+    """
+    if VALIDATE_RESPONSES:
+        validate_response(model, response_model)
+    body = dump_json(model)
+    RESPONSE_CACHE.put(cache_key, body, generation, version, connector_uuid)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def model_response(
+    model: BaseModel | RenderedConnector,
+    headers: dict[str, str] | None = None,
+    response: Response | None = None,
+) -> Response | BaseModel:
+    """
+    Serialize a model built by a handler, without FastAPI validating it again.
 
+    FastAPI validates the returned models against the response_model, dumps them to dicts
+    and encodes these with the json module, twice the work of a direct dump. The
+    response_model of the route still documents the response, and the fields it excludes
+    are excluded by the model itself.
 
-"""
-#! Do no patch patch on array of connectors and sources, or we would mix partial update and bulk update
-@router.patch("", response_model=ConnectorsAndSourcesList)
-def update_connectors_and_sources(
-  connectors_update: ConnectorsAndSourcesUpdate,
-) -> ConnectorsAndSourcesList:
-  updated_connectors = []
-  for connector_update in connectors_update.connectors:
-    existing_connector = get_connector_by_uuid(connector_update.uuid)
-    for source_update in connector_update.sources:
-      existing_source = get_source_by_type(existing_connector, source_update.type)
-      existing_source.available = source_update.available
-    updated_connectors.append(existing_connector)
-  return ConnectorsAndSourcesList(connectors=updated_connectors)
-"""
+    Handlers passing headers must also pass the Response FastAPI injects, which carries
+    them when the model is returned for validation. Rendered connectors are not models, with
+    VALIDATE_RESPONSES their JSON is validated here instead.
+    """
+    if VALIDATE_RESPONSES and isinstance(model, BaseModel):
+        if headers:
+            response.headers.update(headers)
+        return model
+    if VALIDATE_RESPONSES:
+        validate_response(model, ConnectorAndSources)
+    return Response(content=dump_json(model), media_type="application/json", headers=headers)
+
+
+def validate_response(
+    model: BaseModel | RenderedConnector | RenderedConnectorsList,
+    response_model: type[BaseModel],
+):
+    """
+    Validate a response model against the response_model of its route, failing like FastAPI
+    does for the models returned by the handlers.
+
+    Rendered connectors are validated as ConnectorAndSources from their JSON, which leaves
+    out the connector UUID of the sources.
+    """
+    try:
+        if isinstance(model, BaseModel):
+            response_model.model_validate(model, from_attributes=True)
+            return
+        connectors = [model] if isinstance(model, RenderedConnector) else model.connectors
+        for connector in connectors:
+            fields = json.loads(connector.json)
+            for source in fields["sources"]:
+                source["connector_uuid"] = fields["uuid"]
+            ConnectorAndSources.model_validate(fields)
+    except ValidationError as error:
+        raise ResponseValidationError(error.errors(), body=model)
+
+
+def validator_headers(
+    epoch: str, version: int, last_modified: float, suffix: str = ""
+) -> dict[str, str]:
+    # Versions start over with the registry, the epoch tells them apart
+    return {
+        "ETag": f'"{epoch}.{version}{suffix}"',
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+    }
+
+
+def source_etag(epoch: str, version: int) -> str:
+    return f'"{epoch}.{version}"'
+
+
+def parse_version(epoch: str, etag: str) -> int | None:
+    """
+    Return the version of an ETag, quoted or not, None if it is from another epoch.
+    """
+    etag_epoch, _, version = etag.strip('"').removesuffix("-ndjson").partition(".")
+    return int(version) if etag_epoch == epoch and version.isdigit() else None
+
+
+def matches_if_match(if_match: str, etag: str) -> bool:
+    """
+    Evaluate If-Match against the current ETag, with the strong comparison it requires.
+    """
+    etags = {etag.strip() for etag in if_match.split(",")}
+    return "*" in etags or etag in etags
+
+
+def precondition_failed(epoch: str, version: int | None) -> HTTPException:
+    # The current ETag lets the client retry without another read
+    return HTTPException(
+        status_code=412,
+        detail="The source changed since the given ETag",
+        headers={"ETag": source_etag(epoch, version)} if version is not None else None,
+    )
+
+
+def is_not_modified(request: Request, headers: dict[str, str]) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when absent, against the response validators.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        return "*" in etags or headers["ETag"] in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+
+    return False
+
+
+def get_changes_since(seq: int | None, limit: int) -> list[RegistryChange]:
+    # None for a sequence number of another epoch, which tells nothing of the current ones
+    if seq is not None:
+        try:
+            return CHANGELOG.since(seq, limit)
+        except ChangesExpired:
+            pass
+    raise HTTPException(
+        status_code=410,
+        detail="Changes since this sequence number are not available, resync required",
+    )
+
+
+async def iter_change_events(seq: int, limit: int) -> AsyncIterator[str]:
+    while True:
+        try:
+            changes = CHANGELOG.since(seq, limit)
+        except ChangesExpired:
+            yield "event: expired\ndata: resync required\n\n"
+            return
+        for change in changes:
+            yield (
+                f"id: {CHANGELOG.epoch}.{change.seq}\nevent: change\n"
+                f"data: {change.model_dump_json()}\n\n"
+            )
+            seq = change.seq
+        if not changes and not await CHANGELOG.wait(seq, SSE_KEEPALIVE_INTERVAL):
+            yield ": keep-alive\n\n"
+
+
+async def iter_ndjson(
+    registry: RegistrySnapshot, filter: ConnectorsFilter | None, snapshot: AsyncExitStack
+) -> AsyncIterator[bytes]:
+    """
+    Serialize the connectors of a snapshot one at a time, one JSON document per line, then
+    close the snapshot.
+
+    Connectors are read by batches of NDJSON_BATCH_SIZE, following their UUIDs, so that
+    memory use and the time to the first line do not grow with the registry. Lines are
+    grouped in chunks of NDJSON_CHUNK_SIZE bytes, to avoid sending one tiny body chunk per
+    connector.
+    """
+    async with snapshot:
+        chunk = bytearray()
+        after = None
+        while True:
+            connectors = await registry.list_connectors_and_sources_after(
+                after, limit=NDJSON_BATCH_SIZE, filter=filter, rendered=FAST_JSON
+            )
+            for connector in connectors:
+                chunk += dump_json(connector)
+                chunk += b"\n"
+                if len(chunk) >= NDJSON_CHUNK_SIZE:
+                    yield bytes(chunk)
+                    chunk.clear()
+            if len(connectors) < NDJSON_BATCH_SIZE:
+                break
+            after = connectors[-1].uuid
+        if chunk:
+            yield bytes(chunk)
+
+
+def encode_cursor(connector_uuid: UUID) -> str:
+    return base64.urlsafe_b64encode(connector_uuid.bytes).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> UUID:
+    try:
+        return UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 '''
@@ -0,0 +1,73 @@
+from collections.abc import Iterable
+
+from fake_data.db import STORE
+from fastapi import APIRouter
+from fastapi.responses import Response
+from routers.connectors_and_sources import RESPONSE_CACHE
+from utils.metrics import EXPOSITION_MEDIA_TYPE, MetricsRegistry, RequestMetrics
+
+router = APIRouter(tags=["metrics"])
+
+METRICS = MetricsRegistry()
+# Recorded once main instruments the routes
+REQUEST_METRICS = RequestMetrics(METRICS, "conreg_http")
+
+
+def collect_registry() -> Iterable[tuple]:
+    yield "conreg_store_connectors", "gauge", "Connectors in the registry", (), [((), len(STORE))]
+    yield "conreg_store_version", "gauge", "Version of the registry", (), [((), STORE.version)]
+    yield (
+        "conreg_store_lookups_total",
+        "counter",
+        "Lookups of a connector or source by UUID, by whether it was found",
+        ("result",),
+        [(("hit",), STORE.lookup_hits), (("miss",), STORE.lookup_misses)],
+    )
+    yield (
+        "conreg_store_range_reads_total",
+        "counter",
+        "Unfiltered listings, reading a range of the connectors index",
+        (),
+        [((), STORE.range_reads)],
+    )
+    yield (
+        "conreg_store_scans_total",
+        "counter",
+        "Filtered listings, scanning all the connectors",
+        (),
+        [((), STORE.scans)],
+    )
+
+    lookups = RESPONSE_CACHE.hits + RESPONSE_CACHE.misses
+    yield (
+        "conreg_response_cache_lookups_total",
+        "counter",
+        "Lookups of serialized responses, by whether they were cached",
+        ("result",),
+        [(("hit",), RESPONSE_CACHE.hits), (("miss",), RESPONSE_CACHE.misses)],
+    )
+    yield (
+        "conreg_response_cache_hit_ratio",
+        "gauge",
+        "Share of the response cache lookups that were hits, since startup",
+        (),
+        [((), RESPONSE_CACHE.hits / lookups if lookups else 0)],
+    )
+    yield (
+        "conreg_response_cache_entries",
+        "gauge",
+        "Serialized responses in the cache",
+        (),
+        [((), len(RESPONSE_CACHE))],
+    )
+
+
+METRICS.collect(collect_registry)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def retrieve_metrics() -> Response:
+    """
+    Request and registry metrics, in the Prometheus text exposition format.
+    """
+    return Response(content=METRICS.render(), media_type=EXPOSITION_MEDIA_TYPE)
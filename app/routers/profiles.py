@@ -0,0 +1,51 @@
+from config import PROFILE_STORE_SIZE
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from utils.profiling import ProfileStore
+
+router = APIRouter(prefix="/debug/profiles", tags=["debug"])
+
+# Profiles of the requests profiled by the ProfilingMiddleware
+PROFILES = ProfileStore(maxsize=PROFILE_STORE_SIZE)
+
+
+@router.get("")
+async def list_profiles() -> list[dict]:
+    """
+    List the profiles kept in memory, latest first.
+    """
+    return [profile.summary() for profile in PROFILES.list()]
+
+
+@router.get("/{profile_id}")
+async def retrieve_profile(
+    profile_id: int,
+    format: str = Query(
+        "text",
+        pattern="^(text|pstats)$",
+        description="'text' for a report of the top functions, "
+        "'pstats' for the profile file, to load with `pstats.Stats` or snakeviz.",
+    ),
+    sort: str = Query(
+        "cumulative",
+        pattern="^(cumulative|tottime|ncalls)$",
+        description="Sort key of the text report.",
+    ),
+    limit: int = Query(50, ge=1, description="Number of functions in the text report."),
+) -> Response:
+    """
+    Retrieve a profile, by the ID returned in the X-Profile-Id header of the profiled response.
+    """
+    profile = PROFILES.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            content=profile.dump(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'},
+        )
+    return PlainTextResponse(
+        f"{profile.method} {profile.path}?{profile.query} -> {profile.status_code}"
+        f" in {profile.duration * 1000:.1f} ms\n{profile.text(sort, limit)}"
+    )
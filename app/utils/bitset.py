@@ -0,0 +1,61 @@
+"""
+Bitsets stored as Python ints, bit i standing for the item at position i.
+
+Ints are immutable, every operation returns a new bitset. Bitwise operators between
+bitsets (&, |, ^) run in C over machine words, which makes filtering a whole collection
+a handful of operations.
+"""
+
+from collections.abc import Iterable, Iterator
+
+# Set bits are enumerated one window of this many bytes at a time
+WINDOW_SIZE = 256
+
+
+def set_bit(bits: int, position: int, value: bool) -> int:
+    return bits | (1 << position) if value else bits & ~(1 << position)
+
+
+def insert_bit(bits: int, position: int, value: bool = False) -> int:
+    """
+    Insert a bit at the given position, shifting the following bits up by one.
+    """
+    low = bits & ((1 << position) - 1)
+    return (bits >> position << (position + 1)) | (value << position) | low
+
+
+def delete_bit(bits: int, position: int) -> int:
+    """
+    Remove the bit at the given position, shifting the following bits down by one.
+    """
+    low = bits & ((1 << position) - 1)
+    return (bits >> (position + 1) << position) | low
+
+
+def from_positions(positions: Iterable[int], size: int) -> int:
+    """
+    Build a bitset from the positions of its set bits, in O(size) rather than one
+    big int operation per bit.
+    """
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def iter_set_bits(bits: int, start: int = 0) -> Iterator[int]:
+    """
+    Yield the positions of the set bits from `start` on, in ascending order.
+
+    The bitset is split into small windows once, so that finding the next set bit does
+    not cost a full-size int operation.
+    """
+    bits >>= start
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for offset in range(0, len(data), WINDOW_SIZE):
+        window = int.from_bytes(data[offset : offset + WINDOW_SIZE], "little")
+        base = start + offset * 8
+        while window:
+            lowest = window & -window
+            yield base + lowest.bit_length() - 1
+            window ^= lowest
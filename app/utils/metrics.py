@@ -0,0 +1,222 @@
+"""
+Request and registry metrics, exposed in the Prometheus text exposition format.
+
+Request metrics are recorded by wrapping the ASGI app of each route, so that they are
+labelled by route template (`/connectors/{connector_uuid}`) rather than by path, and cost
+a couple of clock reads and dict updates per request, no route matching. They are only
+updated on the event loop thread, where the routes run, so they need no locking.
+
+Counters kept by other components (store reads, response cache hits) are not duplicated:
+collectors registered with `MetricsRegistry.collect` read them at scrape time.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from time import perf_counter
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds of the payload size histogram buckets, in bytes
+SIZE_BUCKETS = (0, 128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608, 33554432)
+EXPOSITION_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+# A sample of a collected metric: its label values, and its value
+Sample = tuple[Labels, float]
+# Called at scrape time: yields (name, type, help, label names, samples) tuples
+Collector = Callable[[], Iterable[tuple[str, str, str, Labels, Iterable[Sample]]]]
+
+
+class Metric:
+    """
+    A metric family: samples indexed by label values, in the order of `label_names`.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, label_names: Labels = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[Labels, float] = {}
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        for labels, value in self._values.items():
+            yield self.name, labels, value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets, whose counts are only made cumulative at scrape time.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, label_names: Labels, buckets: tuple[float, ...]):
+        super().__init__(name, help, label_names)
+        self.buckets = buckets
+        # label values -> [count per bucket (the last one being +Inf)..., sum]
+        self._histograms: dict[Labels, list[float]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            histogram = self._histograms[labels] = [0] * (len(self.buckets) + 2)
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def samples(self) -> Iterable[tuple[str, Labels, float]]:
+        for labels, histogram in self._histograms.items():
+            count = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), histogram):
+                count += bucket_count
+                yield f"{self.name}_bucket", (*labels, format_value(bound)), count
+            yield f"{self.name}_sum", labels, histogram[-1]
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines += family_header(metric.name, metric.type, metric.help)
+            for name, labels, value in metric.samples():
+                label_names = metric.label_names
+                if name.endswith("_bucket") and isinstance(metric, Histogram):
+                    label_names = (*label_names, "le")
+                lines.append(format_sample(name, label_names, labels, value))
+        for collector in self._collectors:
+            for name, type, help, label_names, samples in collector():
+                lines += family_header(name, type, help)
+                for labels, value in samples:
+                    lines.append(format_sample(name, label_names, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """
+    Latency, in-flight count and payload sizes of the requests, per method and route template.
+    """
+
+    def __init__(self, registry: MetricsRegistry, prefix: str):
+        labels = ("method", "route")
+        self.requests = registry.register(
+            Counter(f"{prefix}_requests_total", "Requests handled", (*labels, "status"))
+        )
+        self.in_flight = registry.register(
+            Gauge(f"{prefix}_requests_in_flight", "Requests being handled", labels)
+        )
+        self.duration = registry.register(
+            Histogram(
+                f"{prefix}_request_duration_seconds",
+                "Time to handle a request, until its response is entirely sent",
+                labels,
+                LATENCY_BUCKETS,
+            )
+        )
+        self.request_size = registry.register(
+            Histogram(f"{prefix}_request_size_bytes", "Request body size", labels, SIZE_BUCKETS)
+        )
+        self.response_size = registry.register(
+            Histogram(f"{prefix}_response_size_bytes", "Response body size", labels, SIZE_BUCKETS)
+        )
+
+    def instrument(self, app: FastAPI):
+        """
+        Record the requests of every route of the app, to be called once they are all included.
+
+        Requests matching no route are not recorded.
+        """
+        for route in app.routes:
+            if isinstance(route, APIRoute):
+                route.app = self.wrap(route.app, route.path)
+
+    def wrap(self, route_app, route: str):
+        async def instrumented(scope, receive, send):
+            labels = (scope["method"], route)
+            request_size = 0
+            response_size = 0
+            status = "500"
+
+            async def counting_receive():
+                nonlocal request_size
+                message = await receive()
+                request_size += len(message.get("body", b""))
+                return message
+
+            async def counting_send(message):
+                nonlocal response_size, status
+                if message["type"] == "http.response.start":
+                    status = str(message["status"])
+                elif message["type"] == "http.response.body":
+                    response_size += len(message.get("body", b""))
+                await send(message)
+
+            self.in_flight.inc(labels)
+            start = perf_counter()
+            try:
+                await route_app(scope, counting_receive, counting_send)
+            finally:
+                self.duration.observe(labels, perf_counter() - start)
+                self.in_flight.dec(labels)
+                self.requests.inc((*labels, status))
+                self.request_size.observe(labels, request_size)
+                self.response_size.observe(labels, response_size)
+
+        return instrumented
+
+
+def family_header(name: str, type: str, help: str) -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+
+
+def format_sample(name: str, label_names: Labels, labels: Labels, value: float) -> str:
+    if not label_names:
+        return f"{name} {format_value(value)}"
+    pairs = ",".join(
+        f'{label_name}="{escape_label(label)}"' for label_name, label in zip(label_names, labels)
+    )
+    return f"{name}{{{pairs}}} {format_value(value)}"
+
+
+def format_value(value: float | str) -> str:
+    if isinstance(value, str):
+        return value
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
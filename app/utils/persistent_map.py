@@ -0,0 +1,84 @@
+"""
+Persistent map from int keys: updates return a new map, sharing most of its storage.
+
+The entries are spread over a fixed number of shards, plain dicts selected by the hash of
+the key, which are never modified once the map is built. An update copies the shards of
+the keys it changes and shares all the others with the previous map, so that it costs
+1/SHARD_COUNT of a full copy, while lookups are a dict lookup plus a hash. Since a map
+never changes, it can be read from any thread without locking.
+"""
+
+from collections.abc import Iterable, Iterator
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+SHARD_COUNT = 1024
+SHARD_MASK = SHARD_COUNT - 1
+# Shared by the maps for their empty shards, never modified either
+EMPTY_SHARD: dict = {}
+
+
+class PersistentMap(Generic[V]):
+    __slots__ = ("_shards", "_len")
+
+    def __init__(self, items: Iterable[tuple[int, V]] = ()):
+        shards = [{} for _ in range(SHARD_COUNT)]
+        for key, value in items:
+            shards[hash(key) & SHARD_MASK][key] = value
+        self._shards: tuple[dict[int, V], ...] = tuple(shard or EMPTY_SHARD for shard in shards)
+        self._len = sum(map(len, shards))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._shards[hash(key) & SHARD_MASK]
+
+    def __getitem__(self, key: int) -> V:
+        return self._shards[hash(key) & SHARD_MASK][key]
+
+    def __iter__(self) -> Iterator[int]:
+        for shard in self._shards:
+            yield from shard
+
+    def get(self, key: int, default: V | None = None) -> V | None:
+        return self._shards[hash(key) & SHARD_MASK].get(key, default)
+
+    def set(self, items: Iterable[tuple[int, V]]) -> "PersistentMap[V]":
+        """
+        Return a copy of the map with the given entries added or replaced.
+        """
+        return self._copy(items, ())
+
+    def delete(self, keys: Iterable[int]) -> "PersistentMap[V]":
+        """
+        Return a copy of the map without the given keys, which need not be in the map.
+        """
+        return self._copy((), keys)
+
+    def _copy(self, items: Iterable[tuple[int, V]], deleted: Iterable[int]) -> "PersistentMap[V]":
+        shards = list(self._shards)
+        copied = set()
+        length = self._len
+
+        def writable(key: int) -> dict[int, V]:
+            index = hash(key) & SHARD_MASK
+            if index not in copied:
+                shards[index] = dict(shards[index])
+                copied.add(index)
+            return shards[index]
+
+        for key, value in items:
+            shard = writable(key)
+            length += key not in shard
+            shard[key] = value
+        for key in deleted:
+            if key in shards[hash(key) & SHARD_MASK]:
+                del writable(key)[key]
+                length -= 1
+
+        copy = PersistentMap.__new__(PersistentMap)
+        copy._shards = tuple(shards)
+        copy._len = length
+        return copy
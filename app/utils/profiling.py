@@ -0,0 +1,149 @@
+"""
+Opt-in request profiling: requests run under cProfile, and their profiles are kept in memory.
+
+A request is profiled when it carries the profiling header, or at random with the sampling
+rate. Only one request is profiled at a time, as cProfile hooks the whole thread: requests
+arriving meanwhile run unprofiled. Other requests interleaved with the profiled one on the
+event loop show up in its profile, and work done in worker threads (the SQLite backend)
+does not, so profile with little concurrent traffic.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+from collections import OrderedDict
+from itertools import count
+from threading import Lock
+from time import perf_counter, time
+from typing import NamedTuple
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class Profile(NamedTuple):
+    id: int
+    method: str
+    path: str
+    query: str
+    status_code: int | None
+    # Start time, and duration in seconds
+    created: float
+    duration: float
+    stats: pstats.Stats
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status_code": self.status_code,
+            "created": self.created,
+            "duration_ms": self.duration * 1000,
+        }
+
+    def text(self, sort: str = "cumulative", limit: int = 50) -> str:
+        """
+        Render the profile as a pstats report of its `limit` top functions.
+        """
+        stream = io.StringIO()
+        self.stats.stream = stream
+        self.stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        """
+        Serialize the profile in the pstats file format, as loaded by `pstats.Stats(path)`.
+        """
+        return marshal.dumps(self.stats.stats)
+
+
+class ProfileStore:
+    """
+    The latest profiles, the oldest ones being dropped beyond `maxsize`.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._profiles: OrderedDict[int, Profile] = OrderedDict()
+        self._ids = count(1)
+        self._lock = Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, id: int) -> Profile | None:
+        return self._profiles.get(id)
+
+    def list(self) -> list[Profile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests with the profiling header, or sampled at `sample_rate`.
+
+    Profiled responses carry the ID of their profile in an X-Profile-Id header.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float = 0):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._profiling or not self.should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        id = self.store.next_id()
+        status_code = None
+
+        async def tagging_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", ()), (PROFILE_ID_HEADER, b"%d" % id)],
+                }
+            await send(message)
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        created, start = time(), perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, tagging_send)
+        finally:
+            profiler.disable()
+            duration = perf_counter() - start
+            self._profiling = False
+            self.store.add(
+                Profile(
+                    id,
+                    scope["method"],
+                    scope["path"],
+                    scope.get("query_string", b"").decode("latin-1"),
+                    status_code,
+                    created,
+                    duration,
+                    pstats.Stats(profiler),
+                )
+            )
+
+    def should_profile(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value.lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
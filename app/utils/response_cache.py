@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from threading import Lock
+from uuid import UUID
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized JSON response bodies.
+
+    Entries rendering a connector are tagged with it, so that a mutation only invalidates
+    the entries of the connector that changed. Listings are dropped on every mutation: they
+    carry the version of the whole registry in their ETag, so they are stale after any write.
+
+    Entries also hold the version their body was rendered at, the one of its ETag, and are
+    only served for that version: a request reading the registry at another version
+    misses, so that a body never comes with the validators of another version, even when
+    its invalidation is still on its way.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every invalidation, so that a body rendered before a mutation is not cached
+        self.generation = 0
+        # key -> (version, body)
+        self._entries: OrderedDict[Hashable, tuple[int, bytes]] = OrderedDict()
+        self._keys_by_connector: dict[UUID, set[Hashable]] = {}
+        self._connector_by_key: dict[Hashable, UUID] = {}
+        self._list_keys: set[Hashable] = set()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int) -> bytes | None:
+        """
+        Return the body cached for the key if it was rendered at the given version.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(
+        self,
+        key: Hashable,
+        body: bytes,
+        generation: int,
+        version: int,
+        connector_uuid: UUID | None = None,
+    ):
+        """
+        Cache a response body rendering the given connector, or a listing if it is None, at
+        the given version.
+
+        `generation` must be read before reading the registry for the body, the entry is
+        dropped if an invalidation happened in between.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._discard(key)
+            self._entries[key] = (version, body)
+            if connector_uuid is None:
+                self._list_keys.add(key)
+            else:
+                self._connector_by_key[key] = connector_uuid
+                self._keys_by_connector.setdefault(connector_uuid, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, connector_uuid: UUID | None, structural: bool = False):
+        """
+        Drop the entries rendering the given connector, or every entry if it is None, along
+        with every listing.
+
+        Store change listener: listings are dropped whether the change is `structural` or not.
+        """
+        with self._lock:
+            self.generation += 1
+            if connector_uuid is None:
+                self._entries.clear()
+                self._keys_by_connector.clear()
+                self._connector_by_key.clear()
+                self._list_keys.clear()
+                return
+            for key in list(self._keys_by_connector.get(connector_uuid, ())):
+                self._discard(key)
+            for key in list(self._list_keys):
+                self._discard(key)
+
+    def _discard(self, key: Hashable):
+        if self._entries.pop(key, None) is None:
+            return
+        self._list_keys.discard(key)
+        connector_uuid = self._connector_by_key.pop(key, None)
+        keys = self._keys_by_connector.get(connector_uuid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_connector[connector_uuid]